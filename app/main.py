@@ -1,30 +1,94 @@
-import os
+import os, asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
 from dotenv import load_dotenv
-from app.routes import ingest, search, chat, train
-from app.services import weav_client
 
+# Before the app imports: services read their configuration at import time.
 load_dotenv()
 
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.routes import ingest, search, chat, train, predict
+from app.services import vector_store, http_pool, aci_client, comet_tracker, embeddings, answer_cache, train_jobs, features, warmup, metrics, friendli_client, admission
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: ensure Weaviate schema exists
-    try:
-        weav_client.ensure_schema()
-    except Exception as e:
-        print(f"Warning: Could not initialize Weaviate schema: {e}")
-        print("The app will continue, but /ingest and /search may fail without Weaviate")
+    # Startup: only cheap setup runs here so the server accepts connections at once.
+    # The embedding model, vector store and current classifier are warmed in the
+    # background; GET /ready turns 200 when that is done.
+    store = vector_store.get()
+    http_pool.start()
+    aci_client.start()
+    warm = asyncio.create_task(warmup.run())
+    upkeep = asyncio.create_task(store.maintain())
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop background upkeep and close connections
+    warm.cancel()
+    upkeep.cancel()
+    await train_jobs.stop()
+    store.close()
+    embeddings.close()
+    await aci_client.stop()
+    await http_pool.stop()
+    await asyncio.to_thread(comet_tracker.stop)
 
 app = FastAPI(title="AI Knowledge Sprint", version="0.1.0", lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+
+@app.exception_handler(admission.Overloaded)
+async def overloaded(request, exc: admission.Overloaded):
+    return JSONResponse({"detail": str(exc)}, status_code=429, headers={"Retry-After": str(exc.retry_after)})
 
 @app.get("/health")
 def health():
     return {"ok": True}
 
+@app.get("/ready")
+def ready():
+    if not warmup.state["ready"]:
+        return JSONResponse(warmup.state, status_code=503)
+    return warmup.state
+
+@app.get("/stats")
+def stats():
+    b = embeddings.batcher()
+    return {
+        "query_cache": embeddings.query_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "embed_batcher": {"batches": b.batches, "items": b.items, "pending": b.pending},
+        "embed_server": embeddings.server_stats(),
+        "aci": aci_client.stats(),
+        "train": train_jobs.stats(),
+        "features": features.cache().stats(),
+        "llm": friendli_client.stats(),
+        "admission": admission.stats(),
+    }
+
+@metrics.collector
+def _stats_metrics():
+    s = stats()
+    caches = {"query": s["query_cache"], "answer": s["answer_cache"]}
+    return [
+        ("cache_hits_total", "counter", "Cache hits", [({"cache": c}, v["hits"]) for c, v in caches.items()]),
+        ("cache_misses_total", "counter", "Cache misses", [({"cache": c}, v["misses"]) for c, v in caches.items()]),
+        ("cache_evictions_total", "counter", "Cache evictions", [({"cache": c}, v["evictions"]) for c, v in caches.items()]),
+        ("cache_entries", "gauge", "Entries currently cached", [({"cache": c}, v["size"]) for c, v in caches.items()]),
+        ("embed_batcher_batches_total", "counter", "Encode calls made by the micro-batcher", [({}, s["embed_batcher"]["batches"])]),
+        ("embed_batcher_items_total", "counter", "Texts encoded by the micro-batcher", [({}, s["embed_batcher"]["items"])]),
+        ("embed_batcher_pending", "gauge", "Texts waiting for the next micro-batch", [({}, s["embed_batcher"]["pending"])]),
+        ("aci_events_total", "counter", "Telemetry events by outcome", [({"outcome": k}, s["aci"][k]) for k in ("sent", "dropped", "failed")]),
+        ("aci_queue_depth", "gauge", "Telemetry events waiting to be sent", [({}, s["aci"]["queued"])]),
+        ("train_jobs", "gauge", "Training jobs by status", [({"status": k}, v) for k, v in s["train"]["jobs"].items()]),
+        ("train_rejected_total", "counter", "Training submits refused because the job queue was full", [({}, s["train"]["rejected"])]),
+        ("feature_cache_entries", "gauge", "Cached training feature vectors", [({}, s["features"]["entries"])]),
+        ("llm_breaker_rejected_total", "counter", "Friendli calls refused while the circuit was open", [({}, s["llm"]["breaker"]["rejected"])]),
+    ]
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(ingest.router, prefix="")
 app.include_router(search.router, prefix="")
 app.include_router(chat.router, prefix="")
 app.include_router(train.router, prefix="")
+app.include_router(predict.router, prefix="")
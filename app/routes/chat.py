@@ -1,25 +1,103 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from app.schemas.dto import ChatRequest, ChatResponse, SearchResponseItem
-from app.services import embeddings, weav_client, friendli_client, comet_tracker, aci_client
-import time
+from app.services import embeddings, vector_store, friendli_client, metrics, comet_tracker, aci_client, answer_cache, context, admission
+import asyncio, json, os, time
 
 router = APIRouter()
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(body: ChatRequest):
-    t0=time.time()
-    try:
-        qvec = embeddings.embed(body.message)
-        ctx = weav_client.search(qvec, k=body.k)
+DEADLINE = float(os.getenv("CHAT_DEADLINE", "10")) or None
+
+def _deadline():
+    """Absolute time.monotonic() by which the whole request should be answered."""
+    return time.monotonic() + DEADLINE if DEADLINE else None
+
+async def _prepare(body: ChatRequest, route):
+    # Only retrieval takes an admission slot; the LLM call is remote and has its own deadline.
+    async with admission.slot("chat"):
+        with metrics.stage(route, "embed"):
+            qvec = await embeddings.aembed_query(body.message)
+        with metrics.stage(route, "search"):
+            # Over-fetch so the assembly stage has alternatives to near-duplicates.
+            hits = await asyncio.to_thread(vector_store.get().search, qvec, body.k * context.FETCH_FACTOR, True)
+    with metrics.stage(route, "assemble"):
+        ctx = context.assemble(qvec, body.message, hits, body.k)
+    with metrics.stage(route, "prompt"):
         context_text = "\n\n".join([f"- {c['text']}" for c in ctx])
         messages = [
             {"role":"system","content":"You are a concise assistant. Use the provided context when helpful."},
             {"role":"user","content": f"Context:\n{context_text}\n\nUser message: {body.message}"}
         ]
-        reply = await friendli_client.generate(messages)
+    return qvec, ctx, messages
+
+def _ctx_ids(ctx):
+    return [c.get("id") or vector_store.doc_id(c["text"]) for c in ctx]
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(body: ChatRequest):
+    t0, deadline = time.time(), _deadline()
+    try:
+        qvec, ctx, messages = await _prepare(body, "/chat")
+        with metrics.stage("/chat", "cache"):
+            reply = answer_cache.lookup(qvec, _ctx_ids(ctx))
+        cached = reply is not None
+        if not cached:
+            with metrics.stage("/chat", "llm"):
+                reply = await friendli_client.generate(messages, deadline)
+            if friendli_client.is_answer(reply):
+                answer_cache.store(qvec, _ctx_ids(ctx), reply)
         dt=time.time()-t0
-        comet_tracker.exp().log_metric("chat_seconds", dt)
-        await aci_client.track("chat", {"latency":dt})
-        return ChatResponse(reply=reply, context=[SearchResponseItem(**c) for c in ctx])
+        comet_tracker.log_metric("chat_seconds", dt)
+        aci_client.track("chat", {"latency":dt,"cached":cached})
+        return ChatResponse(reply=reply, context=[SearchResponseItem(**c) for c in ctx], cached=cached)
+    except admission.Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_stream(body: ChatRequest):
+    """Server-sent events: one `context` event, then `token` events as the reply is generated, then `done`."""
+    t0, deadline = time.time(), _deadline()
+    try:
+        qvec, ctx, messages = await _prepare(body, "/chat/stream")
+    except admission.Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+    with metrics.stage("/chat/stream", "cache"):
+        cached = answer_cache.lookup(qvec, _ctx_ids(ctx))
+
+    async def tokens():
+        if cached is not None:
+            yield cached
+            return
+        parts = []
+        async for delta in friendli_client.stream(messages, deadline):
+            parts.append(delta)
+            yield delta
+        reply = "".join(parts)
+        if friendli_client.is_answer(reply):
+            answer_cache.store(qvec, _ctx_ids(ctx), reply)
+
+    async def events():
+        yield _sse("context", {"context": [SearchResponseItem(**c).model_dump() for c in ctx]})
+        ttft = None
+        try:
+            async for delta in tokens():
+                if ttft is None:
+                    ttft = time.time()-t0
+                    comet_tracker.log_metric("chat_ttft_seconds", ttft)
+                yield _sse("token", {"text": delta})
+        except Exception as e:
+            yield _sse("error", {"detail": f"Friendli error: {e}"})
+        dt=time.time()-t0
+        comet_tracker.log_metric("chat_stream_seconds", dt)
+        aci_client.track("chat_stream", {"latency":dt,"ttft":ttft,"cached":cached is not None})
+        yield _sse("done", {"seconds": dt, "ttft": ttft, "cached": cached is not None})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
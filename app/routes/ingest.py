@@ -1,20 +1,219 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from app.schemas.dto import IngestRequest
-from app.services import embeddings, weav_client, comet_tracker, aci_client
-import time
+from app.services import embeddings, vector_store, chunking, metrics, comet_tracker, aci_client, answer_cache, admission
+from typing import List, Optional
+import asyncio, codecs, json, os, time, uuid
 
 router = APIRouter()
 
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "2"))
+
+# The pipeline below works on chunk records: (doc index, chunk id, chunk text, meta, error).
+# Documents are split by chunking.doc_chunks; results are folded back to one item per document.
+
+async def _write_batch(batch, seen, force=False, route="/ingest"):
+    """Embed and write one batch of chunk records; returns one result per record.
+
+    Chunks whose id is already stored are reported as skipped without being embedded.
+    The first record of an id in the upload claims it in `seen` (id -> future of that
+    record's error); later repeats wait for it and are reported as skipped if it was
+    written, or with its error if not. `force` disables the stored-id lookup only."""
+    store = vector_store.get()
+    loop = asyncio.get_running_loop()
+    todo, repeats = [], []
+    for n, (_, rid, _, _, _) in enumerate(batch):
+        if rid in seen:
+            repeats.append(n)
+        else:
+            todo.append(n)
+            seen[rid] = loop.create_future()
+    claimed = list(todo)
+    errors = {}
+    try:
+        if not force and todo:
+            with metrics.stage(route, "lookup"):
+                existing = await asyncio.to_thread(store.existing_ids, [batch[n][1] for n in todo])
+            todo = [n for n in todo if batch[n][1] not in existing]
+        if todo:
+            texts = [batch[n][2] for n in todo]
+            # A lone chunk (the common single /ingest) rides the shared micro-batcher.
+            with metrics.stage(route, "embed"):
+                vecs = [await embeddings.aembed(texts[0])] if len(texts) == 1 else await embeddings.aembed_many(texts)
+            with metrics.stage(route, "upsert"):
+                _, errs = await asyncio.to_thread(store.upsert_many, texts, vecs, [batch[n][1] for n in todo], [batch[n][3] for n in todo])
+            errors = {todo[m]: msg for m, msg in errs.items()}
+            answer_cache.invalidate()
+    except Exception as e:
+        errors, todo = {n: str(e) for n in claimed}, claimed
+    except BaseException:
+        for n in claimed:
+            seen[batch[n][1]].cancel()
+        raise
+    for n in claimed:
+        seen[batch[n][1]].set_result(errors.get(n))
+    for n in repeats:
+        errors[n] = await seen[batch[n][1]]
+    written = set(todo)
+    return [{"index": i, "skipped": n not in written and errors.get(n) is None, "error": errors.get(n)}
+            for n, (i, *_) in enumerate(batch)]
+
+async def _run_batches(records, force=False, route="/ingest"):
+    """Drain an async iterator of chunk records through at most CONCURRENCY in-flight
+    batches of BATCH_SIZE, so streamed uploads are never held in memory whole."""
+    sem = asyncio.Semaphore(CONCURRENCY)
+    tasks, batch, seen, items = [], [], {}, {}
+
+    async def flush(batch):
+        await sem.acquire()
+        t = asyncio.create_task(_write_batch(batch, seen, force, route))
+        t.add_done_callback(lambda _: sem.release())
+        tasks.append(t)
+
+    async for i, rid, text, meta, err in records:
+        item = items.setdefault(i, {"index": i, "id": None, "chunks": 0, "skipped": True, "error": None})
+        if err:
+            item["error"] = err
+            continue
+        item["id"] = (meta or {}).get("parent_id", rid)
+        item["chunks"] += 1
+        batch.append((i, rid, text, meta, None))
+        if len(batch) >= BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    for res in await asyncio.gather(*tasks):
+        for r in res:
+            item = items[r["index"]]
+            item["skipped"] = item["skipped"] and r["skipped"]
+            item["error"] = item["error"] or r["error"]
+    for item in items.values():
+        if item["error"]:
+            item.update(id=None, skipped=False)
+    return [items[i] for i in sorted(items)]
+
+async def _chunk_docs(docs, route="/ingest"):
+    """(index, text, error) documents -> chunk records."""
+    async for i, text, err in docs:
+        if err:
+            yield i, None, None, None, err
+            continue
+        with metrics.stage(route, "chunk"):
+            chunks = chunking.doc_chunks(text) if len(text) <= chunking.CHUNK_TOKENS else await asyncio.to_thread(chunking.doc_chunks, text)
+        for rid, chunk, meta in chunks:
+            yield i, rid, chunk, meta, None
+
+def _finish(event, items, t0):
+    dt=time.time()-t0
+    ok=sum(1 for it in items if it["error"] is None)
+    skipped=sum(1 for it in items if it["skipped"])
+    chunks=sum(it["chunks"] for it in items)
+    rate=ok/dt if dt > 0 else 0.0
+    comet_tracker.log_metric(f"{event}_seconds", dt)
+    comet_tracker.log_metric(f"{event}_docs_per_sec", rate)
+    aci_client.track(event, {"docs":len(items),"chunks":chunks,"failed":len(items)-ok,"skipped":skipped,"latency":dt})
+    return {"ok": ok == len(items), "ingested": ok-skipped, "skipped": skipped, "failed": len(items)-ok,
+            "chunks": chunks, "seconds": dt, "docs_per_sec": rate, "items": items}
+
 @router.post("/ingest")
-async def ingest(body: IngestRequest):
+async def ingest(body: IngestRequest, force: bool = False):
     t0=time.time()
+    async def docs():
+        yield 0, body.text, None
     try:
-        vec = embeddings.embed(body.text)
-        uid = weav_client.upsert(body.text, vec)
+        async with admission.slot("ingest"):
+            item = (await _run_batches(_chunk_docs(docs()), force))[0]
+        if item["error"]:
+            raise RuntimeError(item["error"])
         dt=time.time()-t0
-        comet_tracker.exp().log_parameters({"embed_model":"all-MiniLM-L6-v2"})
-        comet_tracker.exp().log_metric("ingest_seconds", dt)
-        await aci_client.track("ingest", {"id":uid,"latency":dt})
-        return {"ok": True, "id": uid, "seconds": dt}
+        comet_tracker.log_parameters({"embed_model":"all-MiniLM-L6-v2"})
+        comet_tracker.log_metric("ingest_seconds", dt)
+        aci_client.track("ingest", {"id":item["id"],"chunks":item["chunks"],"latency":dt,"skipped":item["skipped"]})
+        return {"ok": True, "id": item["id"], "chunks": item["chunks"], "skipped": item["skipped"], "seconds": dt}
+    except admission.Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ingest failed: {str(e)}")
+
+@router.post("/ingest/batch")
+async def ingest_batch(body: List[IngestRequest], force: bool = False):
+    t0=time.time()
+    async def docs():
+        for i, d in enumerate(body):
+            yield i, d.text, None
+    try:
+        async with admission.slot("ingest"):
+            items = await _run_batches(_chunk_docs(docs(), "/ingest/batch"), force, "/ingest/batch")
+        return _finish("ingest_batch", items, t0)
+    except admission.Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch ingest failed: {str(e)}")
+
+async def _ndjson_lines(request: Request):
+    buf = b""
+    async for part in request.stream():
+        buf += part
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buf.strip():
+        yield buf
+
+@router.post("/ingest/stream")
+async def ingest_stream(request: Request, force: bool = False):
+    """NDJSON upload: one `{"text": ...}` object (or bare JSON string) per line."""
+    t0=time.time()
+    async def docs():
+        i = 0
+        async for line in _ndjson_lines(request):
+            try:
+                d = json.loads(line)
+                text = d if isinstance(d, str) else IngestRequest(**d).text
+                yield i, text, None
+            except Exception as e:
+                yield i, None, f"Invalid line: {e}"
+            i += 1
+    try:
+        async with admission.slot("ingest"):
+            items = await _run_batches(_chunk_docs(docs(), "/ingest/stream"), force, "/ingest/stream")
+        return _finish("ingest_stream", items, t0)
+    except admission.Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Stream ingest failed: {str(e)}")
+
+@router.post("/ingest/document")
+async def ingest_document(request: Request, name: Optional[str] = None, force: bool = False):
+    """One large plain-text document, chunked and embedded as the body streams in.
+    Chunks are stored under the parent id doc_id(name), or a random id without a name."""
+    t0=time.time()
+    parent = vector_store.doc_id(name) if name else str(uuid.uuid4())
+    chunker = chunking.Chunker()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def records_for(chunks):
+        return [(0, chunking.chunk_id(parent, s, text), text, {"parent_id": parent, "start": s, "end": e}, None)
+                for s, e, text in chunks]
+
+    async def records():
+        async for part in request.stream():
+            with metrics.stage("/ingest/document", "chunk"):
+                chunks = await asyncio.to_thread(chunker.feed, decoder.decode(part))
+            for r in records_for(chunks):
+                yield r
+        with metrics.stage("/ingest/document", "chunk"):
+            tail = await asyncio.to_thread(chunker.feed, decoder.decode(b"", final=True))
+            tail += await asyncio.to_thread(chunker.finish)
+        for r in records_for(tail):
+            yield r
+    try:
+        async with admission.slot("ingest"):
+            items = await _run_batches(records(), force, "/ingest/document") or [{"index": 0, "id": parent, "chunks": 0, "skipped": False, "error": None}]
+        return _finish("ingest_document", items, t0)
+    except admission.Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Document ingest failed: {str(e)}")
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, HTTPException
+from app.schemas.dto import PredictRequest, PredictResponse
+from app.services import embeddings, model_registry, metrics, comet_tracker, aci_client, admission
+import asyncio, time
+import numpy as np
+
+router = APIRouter()
+
+@router.post("/predict", response_model=PredictResponse)
+async def predict(body: PredictRequest):
+    t0=time.time()
+    served = await model_registry.acurrent()
+    if served is None:
+        raise HTTPException(status_code=503, detail="No trained model yet; POST /train first")
+    version, model = served
+    try:
+        async with admission.slot("predict"):
+            # Per-text submits share the embedding micro-batcher with concurrent /predict calls.
+            with metrics.stage("/predict", "embed"):
+                X = np.asarray(await asyncio.gather(*(embeddings.aembed(t) for t in body.texts)), dtype=np.float32)
+            with metrics.stage("/predict", "predict"):
+                probs = model.predict_proba(X) if len(body.texts) else np.empty((0, len(model.classes_)))
+        labels = model.classes_[np.argmax(probs, axis=1)] if len(probs) else []
+        classes = [str(c) for c in model.classes_]
+        dt=time.time()-t0
+        comet_tracker.log_metric("predict_seconds", dt)
+        aci_client.track("predict", {"version":version,"n":len(body.texts),"latency":dt})
+        return {"version": version, "seconds": dt,
+                "predictions": [{"label": int(l), "proba": dict(zip(classes, p.tolist()))} for l, p in zip(labels, probs)]}
+    except admission.Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Predict failed: {str(e)}")
+
+@router.get("/models")
+def models():
+    served = model_registry.current()
+    return {"current": served[0] if served else None, "versions": model_registry.versions()}
+
+@router.post("/models/{version}/promote")
+def promote(version: str):
+    if version not in {v["version"] for v in model_registry.versions()}:
+        raise HTTPException(status_code=404, detail="Unknown model version")
+    try:
+        return {"ok": True, "current": model_registry.promote(version)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Promote failed: {str(e)}")
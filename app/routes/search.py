@@ -1,18 +1,50 @@
 from fastapi import APIRouter, Query, HTTPException
-from app.services import embeddings, weav_client, comet_tracker, aci_client
-import time
+from app.schemas.dto import SearchBatchRequest, SearchBatchResponse, SearchResponse
+from app.services import embeddings, vector_store, metrics, comet_tracker, aci_client, admission
+import asyncio, os, time
 
 router = APIRouter()
 
-@router.get("/search")
+BATCH_MAX = int(os.getenv("SEARCH_BATCH_MAX", "1000"))
+
+# Response models let FastAPI serialize straight to JSON bytes in pydantic-core;
+# exclude_none keeps hits without chunk metadata as they were.
+@router.get("/search", response_model=SearchResponse, response_model_exclude_none=True)
 async def search(q: str = Query(...), k: int = 5):
     t0=time.time()
     try:
-        vec = embeddings.embed(q)
-        hits = weav_client.search(vec, k=k)
+        async with admission.slot("search"):
+            with metrics.stage("/search", "embed"):
+                vec = await embeddings.aembed_query(q)
+            with metrics.stage("/search", "search"):
+                hits = await asyncio.to_thread(vector_store.get().search, vec, k)
         dt=time.time()-t0
-        comet_tracker.exp().log_metric("search_seconds", dt)
-        await aci_client.track("search", {"q":q,"k":k,"latency":dt,"hits":len(hits)})
+        comet_tracker.log_metric("search_seconds", dt)
+        aci_client.track("search", {"q":q,"k":k,"latency":dt,"hits":len(hits)})
         return {"results": hits, "seconds": dt}
+    except admission.Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+@router.post("/search/batch", response_model=SearchBatchResponse, response_model_exclude_none=True)
+async def search_batch(body: SearchBatchRequest):
+    """Many queries in one call: one batched encode for the cache misses, then one
+    multi-query search. Results are in input order."""
+    t0=time.time()
+    if len(body.queries) > BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX} queries per batch")
+    try:
+        async with admission.slot("search"):
+            with metrics.stage("/search/batch", "embed"):
+                vecs = await embeddings.aembed_queries([q.q for q in body.queries])
+            with metrics.stage("/search/batch", "search"):
+                hits = await asyncio.to_thread(vector_store.get().search_many, vecs, [q.k for q in body.queries]) if vecs else []
+        dt=time.time()-t0
+        comet_tracker.log_metric("search_batch_seconds", dt)
+        aci_client.track("search_batch", {"queries":len(body.queries),"latency":dt})
+        return {"results": [{"q": q.q, "k": q.k, "hits": h} for q, h in zip(body.queries, hits)], "seconds": dt}
+    except admission.Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch search failed: {str(e)}")
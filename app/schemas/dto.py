@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class IngestRequest(BaseModel):
     text: str
@@ -7,6 +7,35 @@ class IngestRequest(BaseModel):
 class SearchResponseItem(BaseModel):
     text: str
     score: float
+    excerpt: bool = False
+
+class SearchHit(BaseModel):
+    id: str
+    text: str
+    score: float
+    parent_id: Optional[str] = None
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+class SearchResponse(BaseModel):
+    results: List[SearchHit]
+    seconds: float
+
+class SearchQuery(BaseModel):
+    q: str
+    k: int = 5
+
+class SearchBatchRequest(BaseModel):
+    queries: List[SearchQuery]
+
+class SearchBatchItem(BaseModel):
+    q: str
+    k: int
+    hits: List[SearchHit]
+
+class SearchBatchResponse(BaseModel):
+    results: List[SearchBatchItem]
+    seconds: float
 
 class ChatRequest(BaseModel):
     message: str
@@ -15,6 +44,7 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     reply: str
     context: List[SearchResponseItem]
+    cached: bool = False
 
 class TrainExample(BaseModel):
     text: str
@@ -22,3 +52,15 @@ class TrainExample(BaseModel):
 
 class TrainRequest(BaseModel):
     labelled_pairs: List[TrainExample] = []
+
+class PredictRequest(BaseModel):
+    texts: List[str]
+
+class Prediction(BaseModel):
+    label: int
+    proba: Dict[str, float]
+
+class PredictResponse(BaseModel):
+    version: str
+    seconds: float
+    predictions: List[Prediction]
@@ -1,15 +1,81 @@
-import os, httpx, asyncio, json
+import os, json, asyncio
+from app.services import http_pool
 
 URL=os.getenv("ACI_COLLECTOR_URL")
 KEY=os.getenv("ACI_API_KEY")
+QUEUE_SIZE=int(os.getenv("ACI_QUEUE_SIZE","10000"))
+BATCH_SIZE=int(os.getenv("ACI_BATCH_SIZE","100"))
+FLUSH_INTERVAL=float(os.getenv("ACI_FLUSH_INTERVAL","2.0"))
+SHUTDOWN_DEADLINE=float(os.getenv("ACI_SHUTDOWN_DEADLINE","5.0"))
 
-async def track(event: str, payload: dict):
+_queue=None
+_worker=None
+_loop=None
+counters={"sent":0,"dropped":0,"failed":0}
+
+def track(event: str, payload: dict):
+    """Queue an event for the background sender. Never blocks: when the queue is full the event is dropped and counted."""
     data={"event":event,"payload":payload}
     if not URL or not KEY:
         print("[ACI]", json.dumps(data))
         return
+    start()
     try:
-        async with httpx.AsyncClient(timeout=3.0) as cx:
-            await cx.post(URL, json=data, headers={"Authorization": f"Bearer {KEY}"})
+        _queue.put_nowait(data)
+    except asyncio.QueueFull:
+        counters["dropped"]+=1
+
+def start():
+    global _queue, _worker, _loop
+    if not URL or not KEY:
+        return
+    loop=asyncio.get_running_loop()
+    if _loop is not loop or _worker is None or _worker.done():
+        _loop=loop
+        _queue=asyncio.Queue(maxsize=QUEUE_SIZE)
+        _worker=loop.create_task(_run())
+
+async def stop(deadline: float = SHUTDOWN_DEADLINE):
+    """Flush what is queued, giving up after `deadline` seconds."""
+    global _worker
+    if _worker is None:
+        return
+    async def drain():
+        await _queue.put(None)  # sentinel: flush the pending batch without waiting for the interval
+        await _queue.join()
+    try:
+        await asyncio.wait_for(drain(), deadline)
+    except asyncio.TimeoutError:
+        counters["dropped"]+=_queue.qsize()
+    _worker.cancel()
+    _worker=None
+
+def stats():
+    return {**counters, "queued": _queue.qsize() if _queue else 0}
+
+async def _post(batch):
+    try:
+        r = await http_pool.client().post(URL, json={"events":batch}, headers={"Authorization": f"Bearer {KEY}"}, timeout=http_pool.timeout("aci"))
+        r.raise_for_status()
+        counters["sent"]+=len(batch)
     except Exception as _:
-        pass
+        counters["failed"]+=len(batch)
+
+async def _run():
+    loop=asyncio.get_running_loop()
+    while True:
+        batch=[await _queue.get()]
+        deadline=loop.time()+FLUSH_INTERVAL
+        while len(batch) < BATCH_SIZE and batch[-1] is not None:
+            remaining=deadline-loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        events=[e for e in batch if e is not None]
+        if events:
+            await _post(events)
+        for _ in batch:
+            _queue.task_done()
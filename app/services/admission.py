@@ -0,0 +1,152 @@
+import asyncio, heapq, itertools, math, os, threading, time
+from contextlib import asynccontextmanager
+from app.services import metrics
+
+# Admission control for CPU-heavy work. All classes share SLOTS concurrent slots; each
+# class also has its own concurrency cap and a bounded wait queue. Freed slots go to the
+# waiting request with the best (lowest) priority, so interactive reads overtake bulk
+# writes. A request that finds its class's queue full is refused with Overloaded.
+
+# Slots count requests, not threads: most of a request is spent awaiting the embedding
+# micro-batcher, which only batches well with several requests in flight.
+SLOTS = int(os.getenv("ADMISSION_SLOTS", str(8 * (os.cpu_count() or 1))))
+
+def _limits(name, priority, concurrency, queue):
+    return {"priority": priority,
+            "concurrency": int(os.getenv(f"ADMISSION_{name.upper()}_CONCURRENCY", str(concurrency))),
+            "queue": int(os.getenv(f"ADMISSION_{name.upper()}_QUEUE", str(queue)))}
+
+CLASSES = {
+    "search": _limits("search", 0, SLOTS, 256),
+    "chat": _limits("chat", 0, SLOTS, 256),
+    "predict": _limits("predict", 0, SLOTS, 128),
+    "ingest": _limits("ingest", 1, max(1, SLOTS // 4), 32),
+}
+
+QUEUED = metrics.Gauge("admission_queue_depth", "Requests waiting for an admission slot", ("cls",))
+ACTIVE = metrics.Gauge("admission_active", "Requests holding an admission slot", ("cls",))
+REJECTED = metrics.Counter("admission_rejected_total", "Requests refused with 429 because the queue was full", ("cls",))
+WAIT_SECONDS = metrics.Histogram("admission_wait_seconds", "Time spent waiting for an admission slot", ("cls",))
+
+class Overloaded(Exception):
+    def __init__(self, cls, retry_after):
+        super().__init__(f"Too many queued {cls} requests; retry in {retry_after}s")
+        self.cls = cls
+        self.retry_after = retry_after
+
+class Limiter:
+    def __init__(self, slots=SLOTS, classes=CLASSES):
+        self.slots = slots
+        self.classes = classes
+        self.active = {c: 0 for c in classes}
+        self.queued = {c: 0 for c in classes}
+        self.rejected = {c: 0 for c in classes}
+        self._hold = {c: 0.05 for c in classes}  # EWMA of slot hold time, for Retry-After
+        self._waiters = []                        # heap of (priority, seq, cls, future)
+        self._seq = itertools.count()
+        self._granted = set()                     # seqs handed a slot but not yet resumed
+        self._lock = threading.Lock()
+
+    def _free(self, cls):
+        return sum(self.active.values()) < self.slots and self.active[cls] < self.classes[cls]["concurrency"]
+
+    def _grant(self, cls):
+        self.active[cls] += 1
+        ACTIVE.inc(cls=cls)
+
+    def retry_after(self, cls):
+        """Seconds until a place in the queue is likely to open, rounded up."""
+        lim = self.classes[cls]
+        return max(1, math.ceil(self.queued[cls] * self._hold[cls] / max(1, lim["concurrency"])))
+
+    def _dispatch(self):
+        # Hand free slots to waiters, best priority first; a waiter whose class is at its
+        # own cap is passed over (and kept) so it cannot block other classes.
+        skipped = []
+        while self._waiters and sum(self.active.values()) < self.slots:
+            entry = heapq.heappop(self._waiters)
+            _, seq, cls, fut = entry
+            if fut.done():
+                continue
+            if not self._free(cls):
+                skipped.append(entry)
+                continue
+            self.queued[cls] -= 1
+            QUEUED.dec(cls=cls)
+            self._grant(cls)
+            self._granted.add(seq)
+            fut.get_loop().call_soon_threadsafe(lambda f=fut: f.done() or f.set_result(True))
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    async def acquire(self, cls):
+        lim = self.classes[cls]
+        fut, seq = asyncio.get_running_loop().create_future(), next(self._seq)
+        with self._lock:
+            heapq.heappush(self._waiters, (lim["priority"], seq, cls, fut))
+            self.queued[cls] += 1
+            QUEUED.inc(cls=cls)
+            self._dispatch()
+            if seq not in self._granted and self.queued[cls] > lim["queue"]:
+                fut.cancel()
+                self.queued[cls] -= 1
+                QUEUED.dec(cls=cls)
+                self.rejected[cls] += 1
+                REJECTED.inc(cls=cls)
+                raise Overloaded(cls, self.retry_after(cls))
+        t0 = time.perf_counter()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            with self._lock:
+                if seq in self._granted:
+                    self._granted.discard(seq)
+                    self._release(cls)      # granted just as the caller went away
+                else:
+                    fut.cancel()
+                    self.queued[cls] -= 1
+                    QUEUED.dec(cls=cls)
+            raise
+        with self._lock:
+            self._granted.discard(seq)
+        WAIT_SECONDS.observe(time.perf_counter() - t0, cls=cls)
+
+    def _release(self, cls):
+        self.active[cls] -= 1
+        ACTIVE.dec(cls=cls)
+        self._dispatch()
+
+    def release(self, cls, held=None):
+        with self._lock:
+            if held is not None:
+                self._hold[cls] = 0.8 * self._hold[cls] + 0.2 * held
+            self._release(cls)
+
+    @asynccontextmanager
+    async def slot(self, cls):
+        await self.acquire(cls)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(cls, time.perf_counter() - t0)
+
+    def stats(self):
+        return {c: {"active": self.active[c], "queued": self.queued[c], "rejected": self.rejected[c],
+                    "concurrency": self.classes[c]["concurrency"], "queue": self.classes[c]["queue"]}
+                for c in self.classes}
+
+limiter = Limiter()
+
+def slot(cls):
+    """`async with admission.slot("search"):` around a route's CPU-bound work. Disabled with ADMISSION_SLOTS=0."""
+    if limiter.slots <= 0:
+        return _noop()
+    return limiter.slot(cls)
+
+@asynccontextmanager
+async def _noop():
+    yield
+
+def stats():
+    return limiter.stats()
@@ -0,0 +1,99 @@
+import os, threading, time
+from collections import OrderedDict
+import numpy as np
+
+SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+TTL = float(os.getenv("ANSWER_CACHE_TTL", "600")) or None
+THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+
+class SemanticCache:
+    """Chat replies keyed by question embedding + retrieved context ids.
+
+    A lookup hits when an entry has exactly the same context id set and its question
+    embedding has cosine similarity >= `threshold` with the new one. Entries are
+    evicted LRU beyond `maxsize` and expire after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize=SIZE, ttl=TTL, threshold=THRESHOLD):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # seq -> (ctx_key, unit vector, reply, created)
+        self._by_ctx = {}              # ctx_key -> {seq}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vec):
+        v = np.asarray(vec, dtype=np.float32)
+        n = np.linalg.norm(v)
+        return v / n if n else v
+
+    def _drop(self, seq):
+        ctx_key = self._entries.pop(seq)[0]
+        group = self._by_ctx[ctx_key]
+        group.discard(seq)
+        if not group:
+            del self._by_ctx[ctx_key]
+
+    def get(self, vec, ctx_ids):
+        q = self._unit(vec)
+        now = time.monotonic()
+        with self._lock:
+            best, best_sim, expired = None, self.threshold, []
+            for seq in self._by_ctx.get(frozenset(ctx_ids), ()):
+                _, v, _, created = self._entries[seq]
+                if self.ttl and now - created > self.ttl:
+                    expired.append(seq)
+                    continue
+                sim = float(v @ q)
+                if sim >= best_sim:
+                    best, best_sim = seq, sim
+            for seq in expired:
+                self._drop(seq)
+                self.evictions += 1
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            return self._entries[best][2]
+
+    def set(self, vec, ctx_ids, reply):
+        if self.maxsize <= 0:
+            return
+        ctx_key = frozenset(ctx_ids)
+        with self._lock:
+            self._seq += 1
+            self._entries[self._seq] = (ctx_key, self._unit(vec), reply, time.monotonic())
+            self._by_ctx.setdefault(ctx_key, set()).add(self._seq)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_ctx.clear()
+
+    def stats(self):
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+_cache = SemanticCache()
+
+def lookup(vec, ctx_ids):
+    return _cache.get(vec, ctx_ids)
+
+def store(vec, ctx_ids, reply):
+    _cache.set(vec, ctx_ids, reply)
+
+def invalidate():
+    """Called after ingest: new documents can change what the right answer is."""
+    _cache.clear()
+
+def stats():
+    return _cache.stats()
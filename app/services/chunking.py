@@ -0,0 +1,104 @@
+import os
+from app.services.vector_store import doc_id
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "200"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "40"))
+STREAM_BUFFER_CHARS = int(os.getenv("CHUNK_STREAM_BUFFER_CHARS", "65536"))
+# When streaming, windows this close to the end of the buffer wait for more text:
+# the last few tokens may be a word cut in half by the upload boundary.
+_TAIL_GUARD = 16
+
+def _tokenizer():
+    from app.services import embeddings
+    return embeddings.get_model().tokenizer
+
+def _offsets(tokenizer, text):
+    return tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+
+def chunk_id(parent_id: str, start: int, text: str):
+    return doc_id(f"{parent_id}:{start}:{text}")
+
+class Chunker:
+    """Incrementally splits text into windows of at most `max_tokens` model tokens,
+    consecutive windows sharing at least `overlap` tokens. Feed text pieces as they
+    arrive; each call returns the (start, end, text) chunks, with character offsets
+    relative to the whole document, that are final so far. Only a bounded tail is
+    buffered. Windows start at word starts where possible, and the buffer is only ever
+    cut at the start of a returned window, so the chunks depend on the text alone and
+    not on how it was split into pieces.
+    """
+
+    def __init__(self, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP, tokenizer=None, buffer_chars=STREAM_BUFFER_CHARS):
+        if not 0 <= overlap < max_tokens:
+            raise ValueError("overlap must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.step = max_tokens - overlap
+        self.buffer_chars = buffer_chars
+        self.tokenizer = tokenizer
+        self.buf = ""
+        self.base = 0
+        self.resumed = False   # buf starts with a window that was already returned
+
+    def feed(self, text: str):
+        self.buf += text
+        if len(self.buf) < self.buffer_chars:
+            return []
+        return self._emit(final=False)
+
+    def finish(self):
+        return self._emit(final=True)
+
+    def _next_start(self, offs, i):
+        # The last word start within one step of window i, so the next window doesn't
+        # begin with a word-piece continuation; a word longer than a step is cut.
+        k = i + self.step
+        while k > i + 1 and offs[k][0] == offs[k - 1][1]:
+            k -= 1
+        return k if offs[k][0] != offs[k - 1][1] else i + self.step
+
+    def _emit(self, final):
+        tok = self.tokenizer or _tokenizer()
+        offs = _offsets(tok, self.buf)
+        guard = 0 if final else _TAIL_GUARD
+        spans, i, last = [], 0, None
+        if self.resumed and offs:
+            i, last = self._next_start(offs, 0), 0
+        while i < len(offs):
+            j = i + self.max_tokens
+            if final and j >= len(offs):
+                # Last window runs to the end; stepping again would only repeat its overlap.
+                spans.append((offs[i][0], offs[-1][1]))
+                break
+            if j > len(offs) - guard:
+                break
+            spans.append((offs[i][0], offs[j - 1][1]))
+            i, last = self._next_start(offs, i), i
+        chunks = [(self.base + s, self.base + e, self.buf[s:e]) for s, e in spans]
+        if final:
+            self.buf, self.resumed = "", False
+        elif last is not None:
+            # Keep text from the last returned window's start: re-tokenized from there
+            # the tail gives the same tokens, and so the same next window, as the
+            # whole document would.
+            cut = offs[last][0]
+            self.base += cut
+            self.buf = self.buf[cut:]
+            self.resumed = True
+        return chunks
+
+def chunk_spans(text: str, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP, tokenizer=None):
+    # Every token covers at least one character, so short texts can skip tokenization.
+    if len(text) <= max_tokens:
+        return [(0, len(text))] if text else []
+    c = Chunker(max_tokens, overlap, tokenizer, buffer_chars=len(text) + 1)
+    c.feed(text)
+    return [(s, e) for s, e, _ in c.finish()]
+
+def doc_chunks(text: str, tokenizer=None):
+    """Split one document into [(id, chunk text, meta)]. A document that fits in one
+    chunk keeps its plain content-hash id, so short docs are stored exactly as before."""
+    parent = doc_id(text)
+    spans = chunk_spans(text, tokenizer=tokenizer)
+    if len(spans) <= 1:
+        return [(parent, text, {"parent_id": parent, "start": 0, "end": len(text)})]
+    return [(chunk_id(parent, s, text[s:e]), text[s:e], {"parent_id": parent, "start": s, "end": e}) for s, e in spans]
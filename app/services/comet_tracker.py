@@ -1,19 +1,107 @@
-import os
-from comet_ml import Experiment
+import os, threading
 _exp=None
 
+FLUSH_INTERVAL=float(os.getenv("COMET_FLUSH_INTERVAL","10"))
+PERCENTILES=(50,95,99)
+
+_lock=threading.Lock()
+_metrics={}
+_params={}
+_pending_params={}
+_assets=[]
+_worker=None
+_stop=threading.Event()
+_step=0
+_MISSING=object()
+
 def exp():
     global _exp
     if _exp: return _exp
     api_key=os.getenv("COMET_API_KEY")
     workspace=os.getenv("COMET_WORKSPACE")
     project=os.getenv("COMET_PROJECT","ai-knowledge-sprint")
-    if not api_key: 
-        class _Null: 
+    if not api_key:
+        class _Null:
             def log_metric(*a,**k): pass
+            def log_metrics(*a,**k): pass
             def log_parameters(*a,**k): pass
             def log_asset(*a,**k): pass
         _exp=_Null()
         return _exp
+    from comet_ml import Experiment  # heavy import; only paid once Comet is actually used
     _exp=Experiment(api_key=api_key, workspace=workspace, project_name=project, auto_param_logging=False, auto_metric_logging=False)
     return _exp
+
+# Request-path API: these only touch in-memory buffers. The Comet SDK is called
+# from the background worker, which pushes per-interval aggregates.
+
+def log_metric(name: str, value: float):
+    with _lock:
+        _metrics.setdefault(name, []).append(float(value))
+    start()
+
+def log_parameters(params: dict):
+    """Static parameters are sent once; re-logging an unchanged value is a no-op."""
+    with _lock:
+        for k, v in params.items():
+            if _pending_params.get(k, _params.get(k, _MISSING)) != v:
+                _pending_params[k] = v
+    start()
+
+def log_asset(path: str):
+    with _lock:
+        _assets.append(path)
+    start()
+
+def _percentile(sorted_vals, p):
+    return sorted_vals[min(len(sorted_vals)-1, int(round(p/100.0*(len(sorted_vals)-1))))]
+
+def aggregate(values):
+    vals=sorted(values)
+    out={"count":len(vals),"sum":sum(vals),"min":vals[0],"max":vals[-1]}
+    for p in PERCENTILES:
+        out[f"p{p}"]=_percentile(vals,p)
+    return out
+
+def flush():
+    global _metrics, _pending_params, _assets, _step
+    with _lock:
+        metrics, _metrics = _metrics, {}
+        params, _pending_params = _pending_params, {}
+        assets, _assets = _assets, []
+    try:
+        e=exp()
+        if params:
+            e.log_parameters(params)
+            with _lock:
+                _params.update(params)
+        if metrics:
+            _step+=1
+            e.log_metrics({f"{name}_{stat}": v for name, vals in metrics.items() for stat, v in aggregate(vals).items()}, step=_step)
+        for path in assets:
+            e.log_asset(path)
+    except Exception as ex:
+        print(f"[Comet] flush failed: {ex}")
+
+def _run():
+    while not _stop.wait(FLUSH_INTERVAL):
+        flush()
+    flush()
+
+def start():
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        with _lock:
+            if _worker is None or not _worker.is_alive():
+                _stop.clear()
+                _worker=threading.Thread(target=_run, name="comet-metrics", daemon=True)
+                _worker.start()
+
+def stop(timeout: float = 10.0):
+    """Push what is buffered and stop the worker."""
+    global _worker
+    if _worker is None:
+        return
+    _stop.set()
+    _worker.join(timeout)
+    _worker=None
@@ -0,0 +1,95 @@
+import os, re
+import numpy as np
+from app.services import metrics
+
+TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1024"))
+FETCH_FACTOR = int(os.getenv("CONTEXT_FETCH_FACTOR", "3"))
+MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+DUP_THRESHOLD = float(os.getenv("CONTEXT_DUP_THRESHOLD", "0.95"))
+MIN_EXCERPT_TOKENS = 32
+CHARS_PER_TOKEN = 4  # rough size of an LLM token in English text; only used for budgeting
+
+CONTEXT_TOKENS = metrics.Histogram("chat_context_tokens", "Estimated prompt tokens of assembled chat context",
+                                   buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192))
+DROPPED = metrics.Counter("chat_context_dropped_total", "Retrieved hits left out of chat context", ("reason",))
+
+_SENTENCE = re.compile(r"[^.!?\n]+[.!?]*\s*")
+_WORD = re.compile(r"\w+")
+
+def tokens(text: str):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def _unit(x):
+    x = np.asarray(x, dtype=np.float32)
+    n = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.where(n == 0, 1, n)
+
+def _mmr(qvec, hits, k, lam=MMR_LAMBDA, dup=DUP_THRESHOLD):
+    # (picked indexes in pick order, number of hits dropped as near-duplicates)
+    if not hits:
+        return [], 0
+    V = _unit([h["vector"] for h in hits])
+    rel = V @ _unit(qvec)
+    pair = V @ V.T
+    closest = np.full(len(hits), -np.inf)
+    alive = np.ones(len(hits), dtype=bool)
+    picked, dups = [], 0
+    while len(picked) < k and alive.any():
+        score = lam * rel - (1 - lam) * np.where(np.isinf(closest), 0.0, closest)
+        best = int(np.argmax(np.where(alive, score, -np.inf)))
+        picked.append(best)
+        alive[best] = False
+        closest = np.maximum(closest, pair[best])
+        dups += int((alive & (closest >= dup)).sum())
+        alive &= closest < dup
+    return picked, dups
+
+def mmr(qvec, hits, k, lam=MMR_LAMBDA, dup=DUP_THRESHOLD):
+    """Pick up to k hits by maximal marginal relevance over their vectors: relevance to the
+    query minus similarity to what is already picked. Hits at cosine >= `dup` to a picked
+    one are near-duplicates and dropped. Returns hits in pick order."""
+    return [hits[i] for i in _mmr(qvec, hits, k, lam, dup)[0]]
+
+def excerpt(text: str, query: str, budget: int):
+    """The run of whole sentences, at most `budget` tokens, sharing the most words with the
+    query (falls back to a hard cut when even one sentence is too long)."""
+    sents = _SENTENCE.findall(text) or [text]
+    terms = {w.lower() for w in _WORD.findall(query)}
+    hits = [sum(w.lower() in terms for w in _WORD.findall(s)) for s in sents]
+    best, best_hits, lo, size, got = None, -1, 0, 0, 0
+    for hi, s in enumerate(sents):
+        size += tokens(s)
+        got += hits[hi]
+        while size > budget and lo <= hi:
+            size -= tokens(sents[lo])
+            got -= hits[lo]
+            lo += 1
+        if lo <= hi and got > best_hits:
+            best, best_hits = (lo, hi + 1), got
+    if best is None:
+        return text[:budget * CHARS_PER_TOKEN].strip()
+    return "".join(sents[best[0]:best[1]]).strip()
+
+def assemble(qvec, query: str, hits, k, budget=TOKEN_BUDGET):
+    """Diverse, deduplicated context for the prompt: MMR-selected hits, whole while they fit
+    the token budget, excerpted around the query's words once they do not. Returned hits
+    drop their vectors; excerpted ones carry "excerpt": True."""
+    out, left = [], budget
+    idx, dups = _mmr(qvec, hits, k)
+    picked = [hits[i] for i in idx]
+    for h in picked:
+        h = {key: v for key, v in h.items() if key != "vector"}
+        need = tokens(h["text"])
+        if need > left:
+            if left < MIN_EXCERPT_TOKENS:
+                break
+            h = {**h, "text": excerpt(h["text"], query, left), "excerpt": True}
+            need = tokens(h["text"])
+        out.append(h)
+        left -= need
+    CONTEXT_TOKENS.observe(budget - left)
+    DROPPED.inc(dups, reason="duplicate")
+    # The rest of the k * FETCH_FACTOR candidates were only fetched to choose from.
+    DROPPED.inc(len(hits) - len(picked) - dups, reason="overfetch")
+    DROPPED.inc(len(picked) - len(out), reason="budget")
+    return out
@@ -0,0 +1,76 @@
+import os
+import numpy as np
+
+ONNX_PATH = os.getenv("EMBED_ONNX_PATH", "./data/onnx/model.onnx")
+BACKENDS = ("torch", "int8", "onnx")
+
+def load(name: str, model_id: str, threads: int = 0):
+    """An encoder for `model_id` exposing SentenceTransformer's `encode(texts, batch_size=...)`
+    and `.tokenizer`. `threads` > 0 pins the intra-op thread count (torch or ONNX Runtime)."""
+    if name not in BACKENDS:
+        raise RuntimeError(f"Unknown EMBED_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
+    if name == "onnx":
+        return OnnxEncoder(model_id, ONNX_PATH, threads)
+    import torch
+    from sentence_transformers import SentenceTransformer
+    if threads:
+        torch.set_num_threads(threads)
+    model = SentenceTransformer(model_id)
+    if name == "int8":
+        # Dynamic quantization: Linear weights stored as int8, activations quantized per batch.
+        # CPU only, and the Linear layers are nearly all of MiniLM's compute.
+        model = torch.ao.quantization.quantize_dynamic(model.to("cpu"), {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+def mean_pool(hidden, mask):
+    """Masked mean over tokens followed by L2 normalization, as in all-MiniLM-L6-v2's
+    Pooling + Normalize modules."""
+    mask = mask[..., None].astype(np.float32)
+    pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+    norm = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return (pooled / np.clip(norm, 1e-12, None)).astype(np.float32)
+
+def export_onnx(model_id: str, path: str):
+    """Export the transformer (without pooling) to ONNX with dynamic batch and sequence axes."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    model = AutoModel.from_pretrained(model_id).eval()
+    dummy = dict(AutoTokenizer.from_pretrained(model_id)(["export"], return_tensors="pt"))
+    names = list(dummy)
+    axes = {n: {0: "batch", 1: "seq"} for n in names + ["last_hidden_state"]}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(model, (), tmp, kwargs=dummy, input_names=names, output_names=["last_hidden_state"],
+                          dynamic_axes=axes, opset_version=17, dynamo=False)
+    os.replace(tmp, path)
+
+class OnnxEncoder:
+    """ONNX Runtime (CPU) encoder, exported from `model_id` on first use to `path`."""
+
+    def __init__(self, model_id, path, threads=0, max_seq_length=256):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("EMBED_BACKEND=onnx needs `pip install onnxruntime onnx`")
+        from transformers import AutoTokenizer
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        self.max_seq_length = max_seq_length
+        if not os.path.exists(path):
+            export_onnx(model_id, path)
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+        self.inputs = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        texts = list(texts)
+        out = []
+        for start in range(0, len(texts), batch_size):
+            enc = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                 max_length=self.max_seq_length, return_tensors="np")
+            feeds = {k: v.astype(np.int64) for k, v in enc.items() if k in self.inputs}
+            out.append(mean_pool(self.session.run(None, feeds)[0], enc["attention_mask"]))
+        return np.concatenate(out) if out else np.empty((0, 0), dtype=np.float32)
@@ -0,0 +1,221 @@
+import os, sys, json, queue, socket, struct, asyncio, threading
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+
+# A shared embedding process for multi-worker deployments: one copy of the model serves
+# every API worker on the node over a Unix socket. Texts go over the socket as JSON;
+# vectors come back through a shared-memory buffer owned by each client connection, so
+# they are never serialized. Requests from all connections feed one micro-batcher, so
+# concurrent requests from different workers share encode calls.
+#
+#   EMBED_SERVER=/tmp/aks-embed.sock python -m app.services.embed_server
+#   EMBED_SERVER=/tmp/aks-embed.sock uvicorn app.main:app --workers 4
+#
+# Messages are 4-byte big-endian length-prefixed JSON objects with an "op":
+#   hello                      -> {"model": MODEL_TAG, "dim": dim}
+#   encode {texts, shm?}       -> {"n": rows written to the connection's buffer} | {"error"}
+#   stats                      -> {"batches", "items", "pending", "connections"}
+# `shm` names a new buffer for the connection (sent when the client grows it).
+
+CONNECTIONS = int(os.getenv("EMBED_SERVER_CONNECTIONS", "4"))
+TIMEOUT = float(os.getenv("EMBED_SERVER_TIMEOUT", "30"))
+MIN_ROWS = 256
+
+_HEADER = struct.Struct(">I")
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        # The client owns the segment; don't let this process's tracker unlink it at exit.
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+def _frame(msg):
+    body = json.dumps(msg).encode("utf-8")
+    return _HEADER.pack(len(body)) + body
+
+# -- server ---------------------------------------------------------------
+
+class Server:
+    def __init__(self, model, model_tag, window_ms=None, max_batch=None):
+        from app.services import embeddings
+        self.model = model
+        self.model_tag = model_tag
+        self.max_batch = max_batch or embeddings.MAX_BATCH
+        self.dim = int(np.asarray(model.encode(["dim"])).shape[1])
+        self.batcher = embeddings.Batcher(self._encode, window_ms if window_ms is not None else embeddings.BATCH_WINDOW_MS, self.max_batch)
+        self.connections = 0
+
+    def _encode(self, texts):
+        return np.asarray(self.model.encode(texts, batch_size=self.max_batch), dtype=np.float32)
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        shm = None
+        try:
+            while True:
+                try:
+                    (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+                    msg = json.loads(await reader.readexactly(size))
+                except asyncio.IncompleteReadError:
+                    break
+                op = msg.get("op")
+                if op == "hello":
+                    reply = {"model": self.model_tag, "dim": self.dim}
+                elif op == "stats":
+                    b = self.batcher
+                    reply = {"batches": b.batches, "items": b.items, "pending": b.pending, "connections": self.connections}
+                elif op == "encode":
+                    try:
+                        if msg.get("shm"):
+                            if shm is not None:
+                                shm.close()
+                            shm = _attach(msg["shm"])
+                        texts = msg["texts"]
+                        if shm is None or len(texts) * self.dim * 4 > shm.size:
+                            raise RuntimeError("shared buffer too small")
+                        vecs = await asyncio.gather(*(self.batcher.submit(t) for t in texts))
+                        if vecs:
+                            np.ndarray((len(vecs), self.dim), np.float32, buffer=shm.buf)[:] = np.stack(vecs)
+                        reply = {"n": len(vecs)}
+                    except Exception as e:
+                        reply = {"error": str(e)}
+                else:
+                    reply = {"error": f"unknown op {op!r}"}
+                writer.write(_frame(reply))
+                await writer.drain()
+        finally:
+            self.connections -= 1
+            if shm is not None:
+                shm.close()
+            writer.close()
+
+    async def serve(self, path, ready=None):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self._handle, path)
+        os.chmod(path, 0o600)
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+
+# -- client ---------------------------------------------------------------
+
+class _Conn:
+    def __init__(self, path, model_tag):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(TIMEOUT)
+        self.shm = None
+        try:
+            self.sock.connect(path)
+            hello = self.call({"op": "hello"})
+        except Exception:
+            self.sock.close()
+            raise
+        if hello["model"] != model_tag:
+            self.close()
+            raise RuntimeError(f"Embedding server serves {hello['model']}, this process expects {model_tag}")
+        self.dim = hello["dim"]
+
+    def _recv(self, n):
+        buf = bytearray()
+        while len(buf) < n:
+            part = self.sock.recv(n - len(buf))
+            if not part:
+                raise ConnectionError("embedding server closed the connection")
+            buf += part
+        return bytes(buf)
+
+    def call(self, msg):
+        self.sock.sendall(_frame(msg))
+        (size,) = _HEADER.unpack(self._recv(_HEADER.size))
+        return json.loads(self._recv(size))
+
+    def encode(self, texts):
+        msg = {"op": "encode", "texts": texts}
+        need = len(texts) * self.dim * 4
+        if self.shm is None or self.shm.size < need:
+            self._release_shm()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(need, MIN_ROWS * self.dim * 4))
+            msg["shm"] = self.shm.name
+        reply = self.call(msg)
+        if "error" in reply:
+            raise RuntimeError(f"Embedding server error: {reply['error']}")
+        # Copy out: the buffer is reused by this connection's next request.
+        return np.ndarray((reply["n"], self.dim), np.float32, buffer=self.shm.buf).copy()
+
+    def _release_shm(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self):
+        self.sock.close()
+        self._release_shm()
+
+class RemoteEncoder:
+    """Stands in for the model in API workers when EMBED_SERVER is set: `encode` is served
+    by the shared embedding process over up to `connections` pooled connections, and
+    `.tokenizer` (used for chunking) is loaded locally, which needs no model weights."""
+
+    def __init__(self, path, model_id, model_tag, connections=CONNECTIONS):
+        self.path = path
+        self.model_id = model_id
+        self.model_tag = model_tag
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(connections)
+        self._tokenizer = None
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+        return self._tokenizer
+
+    def _call(self, fn):
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = _Conn(self.path, self.model_tag)
+            try:
+                out = fn(conn)
+            except Exception:
+                conn.close()
+                raise
+            self._idle.put(conn)
+            return out
+
+    def encode(self, texts, batch_size=None, **kwargs):
+        texts = list(texts)
+        return self._call(lambda conn: conn.encode(texts))
+
+    def stats(self):
+        return self._call(lambda conn: conn.call({"op": "stats"}))
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+def main():
+    from app.services import embed_backends, embeddings
+    path = sys.argv[1] if len(sys.argv) > 1 else embeddings.SERVER
+    if not path:
+        sys.exit("usage: EMBED_SERVER=<socket path> python -m app.services.embed_server")
+    model = embed_backends.load(embeddings.BACKEND, embeddings.MODEL_ID, embeddings.THREADS)
+    server = Server(model, embeddings.MODEL_TAG)
+    print(f"[embed_server] {embeddings.MODEL_TAG} (dim {server.dim}) listening on {path}")
+    asyncio.run(server.serve(path))
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
@@ -1,11 +1,189 @@
-from sentence_transformers import SentenceTransformer
+import os, asyncio
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from app.services import embed_backends, metrics
+from app.services.cache import LRUCache
+
+MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+BACKEND = os.getenv("EMBED_BACKEND", "torch")
+THREADS = int(os.getenv("EMBED_THREADS", "0"))
+# Unix socket of a shared embedding process (app/services/embed_server.py); empty = load the model here.
+SERVER = os.getenv("EMBED_SERVER", "")
+# Identifies the vectors this process produces: caches keyed by it never mix backends.
+MODEL_TAG = f"{MODEL_ID}@{BACKEND}"
+BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "10000"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "0")) or None
+
+query_cache = LRUCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+
+ENCODE_SECONDS = metrics.Histogram("embed_encode_seconds", "Time per model encode call")
+BATCH_SIZE = metrics.Histogram("embed_batch_size", "Texts per model encode call", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024))
+
 _model = None
+_batcher = None
 
 def get_model():
     global _model
     if _model is None:
-        _model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        if SERVER:
+            from app.services.embed_server import RemoteEncoder
+            _model = RemoteEncoder(SERVER, MODEL_ID, MODEL_TAG)
+        else:
+            _model = embed_backends.load(BACKEND, MODEL_ID, THREADS)
     return _model
 
-def embed(text: str):
-    return get_model().encode([text])[0].tolist()
+def close():
+    """Drop connections to the shared embedding process and free their shared buffers."""
+    if SERVER and _model is not None:
+        _model.close()
+
+def server_stats():
+    """The shared embedding process's batcher counters, or None when not using one."""
+    if not SERVER:
+        return None
+    try:
+        return get_model().stats()
+    except Exception as e:
+        return {"error": str(e)}
+
+# Vectors stay float32 NumPy arrays from the model to the vector store; this code never
+# turns them into Python float lists. The Weaviate path still does, inside the client:
+# get_vector() calls .squeeze().tolist() and the result is struct.pack'ed for gRPC.
+
+def encode(texts):
+    """float32 matrix [len(texts), dim]."""
+    texts = list(texts)
+    BATCH_SIZE.observe(len(texts))
+    with metrics.timer(ENCODE_SECONDS):
+        return np.asarray(get_model().encode(texts, batch_size=MAX_BATCH), dtype=np.float32)
+
+def embed_many(texts):
+    texts = list(texts)
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    return encode(texts)
+
+class Batcher:
+    """Collects concurrent embed requests for up to `window_ms` (or until `max_batch`
+    are waiting) and runs them as one `encode` call on a dedicated thread."""
+
+    def __init__(self, encode, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH):
+        self.encode = encode
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.batches = 0
+        self.items = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        self._loop = None
+        self._task = None
+        self._pending = []
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def _ensure(self, loop):
+        # Queue state is bound to the loop that created it; rebuild if we're on a new one.
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._pending = []
+            self._wake = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    async def submit(self, text: str):
+        loop = asyncio.get_running_loop()
+        self._ensure(loop)
+        fut = loop.create_future()
+        self._pending.append((text, fut))
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        self._wake.set()
+        return await fut
+
+    async def encode_now(self, texts):
+        """Encode an already-full batch on the batcher's thread, skipping the collection window."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.encode, list(texts))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wake.wait()
+            if len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+            batch = [(t, f) for t, f in self._pending[:self.max_batch] if not f.done()]
+            self._pending = self._pending[self.max_batch:]
+            if len(self._pending) < self.max_batch:
+                self._full.clear()
+            if not self._pending:
+                self._wake.clear()
+            if not batch:
+                continue
+            try:
+                vecs = await loop.run_in_executor(self._executor, self.encode, [t for t, _ in batch])
+            except Exception as e:
+                for _, f in batch:
+                    if not f.done():
+                        f.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, f), v in zip(batch, vecs):
+                if not f.done():
+                    f.set_result(v)
+
+def batcher():
+    global _batcher
+    if _batcher is None:
+        _batcher = Batcher(embed_many)
+    return _batcher
+
+async def aembed(text: str):
+    return await batcher().submit(text)
+
+async def aembed_many(texts):
+    # Bulk callers already have a full batch; they still share the one encode thread.
+    return await batcher().encode_now(texts)
+
+def _cached(vec):
+    # An own, read-only copy: a row view would keep its whole batch matrix alive in the
+    # cache, and callers must not be able to change a vector other requests will get.
+    vec = np.array(vec, dtype=np.float32)
+    vec.flags.writeable = False
+    return vec
+
+def _query_key(text: str):
+    # MiniLM's tokenizer is uncased and whitespace-insensitive, so this folds only
+    # queries that would produce the same embedding anyway.
+    return (MODEL_TAG, " ".join(text.lower().split()))
+
+async def aembed_queries(texts):
+    """aembed_query() for many queries: cache misses are encoded together in one batch."""
+    keys = [_query_key(t) for t in texts]
+    vecs = [query_cache.get(k) for k in keys]
+    missing = {}
+    for i, (key, vec) in enumerate(zip(keys, vecs)):
+        if vec is None:
+            missing.setdefault(key, []).append(i)
+    if missing:
+        fresh = await aembed_many([texts[idx[0]] for idx in missing.values()])
+        for (key, idx), vec in zip(missing.items(), fresh):
+            vec = _cached(vec)
+            query_cache.set(key, vec)
+            for i in idx:
+                vecs[i] = vec
+    return vecs
+
+async def aembed_query(text: str):
+    """aembed() for user queries, served from the query cache when possible."""
+    key = _query_key(text)
+    vec = query_cache.get(key)
+    if vec is None:
+        vec = _cached(await aembed(text))
+        query_cache.set(key, vec)
+    return vec
@@ -0,0 +1,137 @@
+import os, glob, hashlib, threading
+import numpy as np
+from app.services import embeddings
+
+CACHE_PATH = os.getenv("FEATURE_CACHE_PATH", "./data/features")
+MAX_SHARDS = int(os.getenv("FEATURE_CACHE_MAX_SHARDS", "32"))
+
+_cache = None
+
+def key(text: str):
+    # The model tag is part of the key, so switching models or backends never serves stale vectors.
+    return hashlib.sha1(f"{embeddings.MODEL_TAG}\0{text}".encode("utf-8")).digest()
+
+class FeatureCache:
+    """Embedding vectors keyed by content hash, on disk as append-only shards:
+    `NNNNNN.npy` (float32 [n, dim], memory-mapped when read) plus `NNNNNN.keys`
+    (n 20-byte SHA1 keys). The keys file is written last, so a shard without one is
+    an interrupted write and is ignored. Past `max_shards` the shards are merged."""
+
+    def __init__(self, path=CACHE_PATH, max_shards=MAX_SHARDS):
+        self.path = path
+        self.max_shards = max_shards
+        self.shards = {}   # shard number -> memmapped vectors
+        self.index = {}    # key -> (shard number, row)
+        self.hits = 0
+        self.misses = 0
+        self._opened = False
+        self._lock = threading.Lock()
+
+    def _file(self, n, ext):
+        return os.path.join(self.path, f"{n:06d}.{ext}")
+
+    def open(self):
+        if self._opened:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        for keys_file in sorted(glob.glob(os.path.join(self.path, "*.keys"))):
+            self._load(int(os.path.basename(keys_file).split(".")[0]))
+        self._opened = True
+
+    def _load(self, n):
+        with open(self._file(n, "keys"), "rb") as f:
+            raw = f.read()
+        self.shards[n] = np.load(self._file(n, "npy"), mmap_mode="r")
+        for row in range(len(raw) // 20):
+            self.index[raw[row * 20:(row + 1) * 20]] = (n, row)
+
+    def _write(self, keys, X):
+        n = max(self.shards, default=0) + 1
+        np.save(self._file(n, "npy"), np.ascontiguousarray(X, dtype=np.float32))
+        tmp = self._file(n, "keys.tmp")
+        with open(tmp, "wb") as f:
+            f.write(b"".join(keys))
+        os.replace(tmp, self._file(n, "keys"))
+        self._load(n)
+
+    def compact(self):
+        """Merge every shard into one."""
+        with self._lock:
+            self.open()
+            if len(self.shards) <= 1:
+                return
+            old = list(self.shards)
+            keys = list(self.index)
+            X = self.gather(keys, np.empty((len(keys), self.shards[old[0]].shape[1]), dtype=np.float32), range(len(keys)))
+            self._write(keys, X)
+            for n in old:
+                del self.shards[n]
+                os.remove(self._file(n, "keys"))
+                os.remove(self._file(n, "npy"))
+
+    def gather(self, keys, out, rows):
+        """Copy the cached vectors for `keys` into out[rows], one fancy-index read per shard."""
+        by_shard = {}
+        for k, r in zip(keys, rows):
+            n, src = self.index[k]
+            by_shard.setdefault(n, ([], []))
+            by_shard[n][0].append(src); by_shard[n][1].append(r)
+        for n, (src, dst) in by_shard.items():
+            out[dst] = self.shards[n][np.asarray(src)]
+        return out
+
+    def extract(self, texts, encode=None, chunk=1024, progress=None):
+        """Feature matrix for `texts` (float32 [len(texts), dim]). Cached rows are copied
+        from disk; only unseen texts are encoded, `chunk` at a time, straight into the
+        preallocated matrix, and then added to the cache as one new shard.
+        `progress(rows_done)` is called as rows are filled."""
+        encode = encode or embeddings.encode
+        keys = [key(t) for t in texts]
+        X = None
+        with self._lock:
+            self.open()
+            cached = [r for r, k in enumerate(keys) if k in self.index]
+            todo, first = [], {}
+            for r, k in enumerate(keys):
+                if k not in self.index and k not in first:
+                    first[k] = r
+                    todo.append(r)
+            self.hits += len(cached)
+            self.misses += len(todo)
+            if cached:
+                dim = self.shards[self.index[keys[cached[0]]][0]].shape[1]
+                X = self.gather([keys[r] for r in cached], np.empty((len(texts), dim), dtype=np.float32), cached)
+        done = len(cached)
+        for start in range(0, len(todo), chunk):
+            rows = todo[start:start + chunk]
+            V = encode([texts[r] for r in rows])
+            if X is None:
+                X = np.empty((len(texts), V.shape[1]), dtype=np.float32)
+            X[rows] = V
+            done += len(rows)
+            if progress:
+                progress(done)
+        if X is None:
+            return np.empty((0, 0), dtype=np.float32)
+        # Repeats of a text within this call copy the row encoded for its first occurrence.
+        for r, k in enumerate(keys):
+            if k in first and first[k] != r:
+                X[r] = X[first[k]]
+        if progress:
+            progress(len(texts))
+        if todo:
+            with self._lock:
+                self._write([keys[r] for r in todo], X[todo])
+                many = len(self.shards) > self.max_shards
+            if many:
+                self.compact()
+        return X
+
+    def stats(self):
+        return {"entries": len(self.index), "shards": len(self.shards), "hits": self.hits, "misses": self.misses}
+
+def cache():
+    global _cache
+    if _cache is None:
+        _cache = FeatureCache()
+    return _cache
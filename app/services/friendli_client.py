@@ -1,18 +1,128 @@
-import os, httpx
+import os, asyncio, json, time
+from app.services import http_pool, metrics, resilience
 
 API_URL = os.getenv("FRIENDLI_API_URL")
 API_KEY = os.getenv("FRIENDLI_API_KEY")
+HEDGE = os.getenv("FRIENDLI_HEDGE", "false").lower() in ("1", "true", "yes")
+HEDGE_QUANTILE = float(os.getenv("FRIENDLI_HEDGE_QUANTILE", "0.95"))
+BREAKER_FAILURES = int(os.getenv("FRIENDLI_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("FRIENDLI_BREAKER_RESET", "30"))
+PLACEHOLDER = "Friendli not configured; returning local placeholder."
+ERROR_PREFIX = "(Friendli error: "
 
-async def generate(messages):
+CALL_SECONDS = metrics.Histogram("llm_request_seconds", "Friendli call latency (streams: until the last token)", ("mode", "outcome"))
+TTFT_SECONDS = metrics.Histogram("llm_ttft_seconds", "Friendli streaming time to first token")
+IN_FLIGHT = metrics.Gauge("llm_requests_in_flight", "Friendli calls currently open")
+HEDGES = metrics.Counter("llm_hedges_total", "Hedged Friendli requests sent, and how many beat the original", ("event",))
+BREAKER_STATE = metrics.Gauge("llm_breaker_state", "Friendli circuit breaker state (1 for the current state)", ("state",))
+
+def _on_breaker(state):
+    for s in (resilience.Breaker.CLOSED, resilience.Breaker.HALF_OPEN, resilience.Breaker.OPEN):
+        BREAKER_STATE.set(1 if s == state else 0, state=s)
+    print(f"[friendli] circuit {state}")
+
+breaker = resilience.Breaker(BREAKER_FAILURES, BREAKER_RESET, on_change=_on_breaker)
+latencies = resilience.LatencyWindow()
+BREAKER_STATE.set(1, state=resilience.Breaker.CLOSED)
+
+def _headers():
+    return {"Authorization": f"Bearer {API_KEY}", "Content-Type":"application/json"}
+
+def is_error(reply: str):
+    return reply.startswith(ERROR_PREFIX)
+
+def is_answer(reply: str):
+    """A reply from the model, as opposed to an error or the not-configured placeholder."""
+    return bool(reply) and reply != PLACEHOLDER and not is_error(reply)
+
+def stats():
+    return {"breaker": breaker.stats(), "hedge_delay": latencies.quantile(HEDGE_QUANTILE) if HEDGE else None}
+
+async def _post(payload, deadline):
+    IN_FLIGHT.inc()
+    try:
+        timeout = http_pool.timeout("friendli", resilience.remaining(deadline))
+        r = await http_pool.client().post(API_URL, json=payload, headers=_headers(), timeout=timeout)
+        r.raise_for_status()
+        return r.json().get("choices",[{}])[0].get("message",{}).get("content","(no content)")
+    finally:
+        IN_FLIGHT.dec()
+
+async def generate(messages, deadline=None):
+    """One reply, or an ERROR_PREFIX string. `deadline` (time.monotonic()) bounds the whole
+    call including a hedge; while the circuit is open calls fail without reaching the upstream."""
     if not API_URL or not API_KEY:
-        return "Friendli not configured; returning local placeholder."
-    headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type":"application/json"}
+        return PLACEHOLDER
+    if deadline is not None and deadline <= time.monotonic():
+        # Spent before reaching us (slow retrieval); not the upstream's fault.
+        CALL_SECONDS.observe(0.0, mode="generate", outcome="timeout")
+        return f"{ERROR_PREFIX}deadline exceeded)"
+    if not breaker.allow():
+        CALL_SECONDS.observe(0.0, mode="generate", outcome="rejected")
+        return f"{ERROR_PREFIX}circuit open)"
     payload = {"model":"friendli-quick","messages":messages}
+    t0 = time.perf_counter()
     try:
-        async with httpx.AsyncClient(timeout=5.0) as cx:
-            r = await cx.post(API_URL, json=payload, headers=headers)
-            r.raise_for_status()
-            data = r.json()
-            return data.get("choices",[{}])[0].get("message",{}).get("content","(no content)")
+        delay = latencies.quantile(HEDGE_QUANTILE) if HEDGE else None
+        reply = await resilience.hedged(lambda: _post(payload, deadline), delay, deadline,
+                                        on_hedge=lambda event: HEDGES.inc(event=event))
     except Exception as e:
-        return f"(Friendli error: {e})"
+        breaker.record(False)
+        outcome = "timeout" if isinstance(e, resilience.DeadlineExceeded) else "error"
+        CALL_SECONDS.observe(time.perf_counter() - t0, mode="generate", outcome=outcome)
+        return f"{ERROR_PREFIX}{e})"
+    except BaseException:
+        breaker.release()  # cancelled: says nothing about the upstream
+        raise
+    dt = time.perf_counter() - t0
+    breaker.record(True)
+    latencies.add(dt)
+    CALL_SECONDS.observe(dt, mode="generate", outcome="ok")
+    return reply
+
+async def stream(messages, deadline=None):
+    """Yield content deltas from the upstream's OpenAI-style SSE stream. Errors propagate to the caller.
+    `deadline` bounds the wait for each chunk, not the length of the whole reply."""
+    if not API_URL or not API_KEY:
+        yield PLACEHOLDER
+        return
+    try:
+        left = resilience.remaining(deadline)
+    except resilience.DeadlineExceeded:
+        # Spent before reaching us (slow retrieval); not the upstream's fault.
+        CALL_SECONDS.observe(0.0, mode="stream", outcome="timeout")
+        raise
+    if not breaker.allow():
+        CALL_SECONDS.observe(0.0, mode="stream", outcome="rejected")
+        raise RuntimeError("circuit open")
+    payload = {"model":"friendli-quick","messages":messages,"stream":True}
+    t0, first, outcome = time.perf_counter(), True, "error"
+    IN_FLIGHT.inc()
+    try:
+        timeout = http_pool.timeout("friendli", left)
+        async with http_pool.client().stream("POST", API_URL, json=payload, headers=_headers(), timeout=timeout) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data).get("choices",[{}])[0].get("delta",{}).get("content")
+                if delta:
+                    if first:
+                        TTFT_SECONDS.observe(time.perf_counter() - t0)
+                        first = False
+                    yield delta
+        outcome = "ok"
+    except (asyncio.CancelledError, GeneratorExit):
+        outcome = "cancelled"
+        raise
+    finally:
+        IN_FLIGHT.dec()
+        if outcome == "cancelled" and first:
+            breaker.release()  # the client went away before the upstream answered
+        else:
+            # Once tokens arrive the upstream is healthy, even if the client then goes away.
+            breaker.record(outcome == "ok" or not first)
+        CALL_SECONDS.observe(time.perf_counter() - t0, mode="stream", outcome=outcome)
@@ -0,0 +1,50 @@
+import os, httpx
+
+MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "30"))
+HTTP2 = os.getenv("HTTP_POOL_HTTP2", "false").lower() in ("1", "true", "yes")
+CONNECT_TIMEOUT = float(os.getenv("HTTP_POOL_CONNECT_TIMEOUT", "2.0"))
+
+# Per-upstream read/write budgets; connect is shared since it depends on the network, not the upstream.
+TIMEOUTS = {
+    "friendli": float(os.getenv("FRIENDLI_TIMEOUT", "5.0")),
+    "aci": float(os.getenv("ACI_TIMEOUT", "3.0")),
+}
+
+_client = None
+
+def _http2():
+    if not HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401  (httpx[http2] extra)
+        return True
+    except ImportError:
+        print("[http_pool] HTTP_POOL_HTTP2 set but h2 is not installed; using HTTP/1.1")
+        return False
+
+def start():
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=_http2(),
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE, keepalive_expiry=KEEPALIVE_EXPIRY),
+            timeout=httpx.Timeout(5.0, connect=CONNECT_TIMEOUT),
+        )
+    return _client
+
+async def stop():
+    global _client
+    c, _client = _client, None
+    if c is not None:
+        await c.aclose()
+
+def client():
+    """The shared client; started by the app lifespan, or lazily outside of it."""
+    return _client or start()
+
+def timeout(upstream: str, budget=None):
+    """The upstream's timeout, shortened to `budget` seconds when a request deadline is closer."""
+    t = TIMEOUTS[upstream] if budget is None else min(TIMEOUTS[upstream], budget)
+    return httpx.Timeout(t, connect=min(CONNECT_TIMEOUT, t))
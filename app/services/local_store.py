@@ -0,0 +1,242 @@
+import os, json, asyncio, threading
+import numpy as np
+from app.services import metrics
+from app.services.vector_store import VectorStore, OP_SECONDS, doc_id
+
+SCAN_CHUNK = 65536
+REBUILD_INTERVAL = float(os.getenv("LOCAL_STORE_REBUILD_INTERVAL", "30"))
+
+def _normalize(x):
+    x = np.asarray(x, dtype=np.float32)
+    n = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.where(n == 0, 1, n)
+
+def _top_k(scores, rows, k):
+    if len(scores) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        scores, rows = scores[part], rows[part]
+    order = np.argsort(-scores, kind="stable")
+    return scores[order], rows[order]
+
+class LocalStore(VectorStore):
+    """Embedded vector store: unit-normalized vectors in a memory-mapped float32/float16
+    matrix, with id/text/chunk metadata in an append-only JSONL log next to it.
+
+    Search is a vectorized dot product over the matrix (`index="exact"`), or an IVF
+    index (`index="ivf"`): k-means centroids partition the rows and a query only
+    scores the rows in its `nprobe` closest lists.
+    """
+
+    def __init__(self, path, dim=384, dtype="float32", index="exact", nlist=0, nprobe=8):
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.index = index
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ids, self.texts, self.metas, self.rows = [], [], [], {}
+        self.n = 0
+        self._vecs = None
+        self._ivf = None
+        self._ivf_n = 0
+        self._lock = threading.Lock()
+
+    # -- storage ---------------------------------------------------------
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def open(self):
+        if self._vecs is not None:
+            return
+        # Concurrent first calls (parallel ingest batches) must not both create the files.
+        with self._lock:
+            if self._vecs is not None:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            header = self._file("store.json")
+            if os.path.exists(header):
+                with open(header) as f:
+                    h = json.load(f)
+                self.dim, self.dtype = h["dim"], np.dtype(h["dtype"])
+            else:
+                with open(header, "w") as f:
+                    json.dump({"dim": self.dim, "dtype": self.dtype.name}, f)
+            if os.path.exists(self._file("meta.jsonl")):
+                with open(self._file("meta.jsonl")) as f:
+                    for line in f:
+                        rec = json.loads(line)
+                        row = rec["row"]
+                        if row == len(self.ids):
+                            self.ids.append(rec["id"]); self.texts.append(rec["text"]); self.metas.append(rec.get("meta"))
+                        else:
+                            self.ids[row], self.texts[row], self.metas[row] = rec["id"], rec["text"], rec.get("meta")
+                        self.rows[rec["id"]] = row
+            vec_file = self._file("vectors.bin")
+            rowbytes = self.dim * self.dtype.itemsize
+            cap = os.path.getsize(vec_file) // rowbytes if os.path.exists(vec_file) else 0
+            if cap < max(len(self.ids), 1):
+                cap = max(len(self.ids), 1024)
+                with open(vec_file, "ab") as f:
+                    f.truncate(cap * rowbytes)
+            vecs = np.memmap(vec_file, dtype=self.dtype, mode="r+", shape=(cap, self.dim))
+            self.n = len(self.ids)
+            self._vecs = vecs
+            if self.index == "ivf" and os.path.exists(self._file("ivf.npy")):
+                self._set_ivf(np.load(self._file("ivf.npy")))
+
+    def close(self):
+        if self._vecs is not None:
+            self._vecs.flush()
+
+    def _grow(self, need):
+        cap = self._vecs.shape[0]
+        if need <= cap:
+            return
+        cap = max(need, cap * 2)
+        self._vecs.flush()
+        with open(self._file("vectors.bin"), "r+b") as f:
+            f.truncate(cap * self.dim * self.dtype.itemsize)
+        self._vecs = np.memmap(self._file("vectors.bin"), dtype=self.dtype, mode="r+", shape=(cap, self.dim))
+
+    @metrics.timed(OP_SECONDS, backend="local", op="upsert_many")
+    def upsert_many(self, texts, vectors, ids=None, metas=None):
+        if not texts:
+            return [], {}
+        self.open()
+        V = _normalize(vectors)
+        if V.shape[1] != self.dim:
+            raise RuntimeError(f"Vector dimension {V.shape[1]} does not match store dimension {self.dim}")
+        ids = ids or [doc_id(t) for t in texts]
+        metas = metas or [None] * len(texts)
+        with self._lock:
+            rows, log = [], []
+            for uid, text, meta in zip(ids, texts, metas):
+                row = self.rows.get(uid)
+                if row is None:
+                    row = len(self.ids)
+                    self.ids.append(uid); self.texts.append(text); self.metas.append(meta); self.rows[uid] = row
+                else:
+                    self.texts[row], self.metas[row] = text, meta
+                rows.append(row)
+                log.append(json.dumps({"id": uid, "row": row, "text": text, "meta": meta}))
+            self._grow(len(self.ids))
+            self._vecs[rows] = V.astype(self.dtype)
+            with open(self._file("meta.jsonl"), "a") as f:
+                f.write("\n".join(log) + "\n")
+            if self._ivf is not None:
+                self._assign(np.asarray(rows), V)
+            # Publish the new rows only once their vectors are in place.
+            self.n = len(self.ids)
+        return ids, {}
+
+    @metrics.timed(OP_SECONDS, backend="local", op="existing_ids")
+    def existing_ids(self, ids):
+        self.open()
+        return {i for i in ids if i in self.rows}
+
+    # -- search ----------------------------------------------------------
+
+    @metrics.timed(OP_SECONDS, backend="local", op="search")
+    def search(self, vector, k=5, with_vectors=False):
+        self.open()
+        q = _normalize(vector)
+        n, vecs, ivf = self.n, self._vecs, self._ivf
+        if n == 0 or k <= 0:
+            return []
+        if ivf is not None:
+            centroids, lists = ivf
+            probe = np.argsort(-(centroids @ q))[:self.nprobe]
+            rows = np.concatenate([lists[c] for c in probe])
+            rows = rows[rows < n]
+            scores, rows = _top_k(vecs[rows] @ q, rows, k)
+        else:
+            scores, rows = np.empty(0, np.float32), np.empty(0, np.int64)
+            for start in range(0, n, SCAN_CHUNK):
+                stop = min(n, start + SCAN_CHUNK)
+                s = vecs[start:stop] @ q
+                scores, rows = _top_k(np.concatenate([scores, s]), np.concatenate([rows, np.arange(start, stop)]), k)
+        return [self._hit(r, s, with_vectors) for s, r in zip(scores, rows)]
+
+    @metrics.timed(OP_SECONDS, backend="local", op="search_many")
+    def search_many(self, vectors, ks):
+        """Exact search for many queries in one pass over the matrix: each chunk of rows is
+        scored against all queries with a single matrix product."""
+        if not ks:
+            return []
+        self.open()
+        Q = _normalize(vectors).reshape(len(ks), -1)
+        n, vecs = self.n, self._vecs
+        kmax = min(max(ks, default=0), n)
+        if self._ivf is not None or kmax <= 0:
+            return [self.search(q, k) for q, k in zip(Q, ks)]
+        scores, rows = np.empty((0, len(Q)), np.float32), np.empty((0, len(Q)), np.int64)
+        for start in range(0, n, SCAN_CHUNK):
+            stop = min(n, start + SCAN_CHUNK)
+            scores = np.concatenate([scores, vecs[start:stop] @ Q.T])
+            rows = np.concatenate([rows, np.repeat(np.arange(start, stop)[:, None], len(Q), axis=1)])
+            if len(scores) > kmax:
+                part = np.argpartition(-scores, kmax - 1, axis=0)[:kmax]
+                scores, rows = np.take_along_axis(scores, part, 0), np.take_along_axis(rows, part, 0)
+        order = np.argsort(-scores, axis=0, kind="stable")
+        scores, rows = np.take_along_axis(scores, order, 0), np.take_along_axis(rows, order, 0)
+        return [[self._hit(r, s) for s, r in zip(scores[:max(k, 0), j], rows[:max(k, 0), j])] for j, k in enumerate(ks)]
+
+    def _hit(self, row, score, with_vector=False):
+        hit = {"id": self.ids[row], "text": self.texts[row], "score": float(score), **(self.metas[row] or {})}
+        if with_vector:
+            hit["vector"] = np.asarray(self._vecs[row], dtype=np.float32)
+        return hit
+
+    # -- IVF ---------------------------------------------------------------
+
+    def _set_ivf(self, centroids):
+        assign = np.empty(self.n, dtype=np.int32)
+        for start in range(0, self.n, SCAN_CHUNK):
+            stop = min(self.n, start + SCAN_CHUNK)
+            assign[start:stop] = np.argmax(self._vecs[start:stop] @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(centroids) + 1))
+        self._ivf = (centroids, [order[bounds[c]:bounds[c + 1]] for c in range(len(centroids))])
+        self._ivf_n = self.n
+
+    def _assign(self, rows, V):
+        centroids, lists = self._ivf
+        assign = np.argmax(V @ centroids.T, axis=1)
+        lists = list(lists)
+        for c in np.unique(assign):
+            lists[c] = np.union1d(lists[c], rows[assign == c])
+        self._ivf = (centroids, lists)
+
+    def build_index(self, nlist=0, iters=10, seed=0):
+        """(Re)train IVF centroids with spherical k-means on a sample of the stored vectors."""
+        self.open()
+        n = self.n
+        nlist = min(n, nlist or self.nlist or max(1, int(np.sqrt(n))))
+        if nlist == 0:
+            return
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(n, size=min(n, nlist * 256), replace=False))
+        X = np.asarray(self._vecs[sample], dtype=np.float32)
+        C = X[rng.choice(len(X), size=nlist, replace=False)].copy()
+        for _ in range(iters):
+            assign = np.argmax(X @ C.T, axis=1)
+            sums = np.zeros_like(C)
+            np.add.at(sums, assign, X)
+            filled = np.bincount(assign, minlength=nlist) > 0
+            C[filled] = _normalize(sums[filled])
+        np.save(self._file("ivf.npy"), C)
+        with self._lock:
+            self._set_ivf(C)
+
+    def _index_stale(self):
+        # Build once there is enough data to cluster, then retrain whenever the store doubles.
+        if self.index != "ivf" or self.n < 1024:
+            return False
+        return self._ivf is None or self.n >= 2 * self._ivf_n
+
+    async def maintain(self):
+        while True:
+            await asyncio.sleep(REBUILD_INTERVAL)
+            if self._index_stale():
+                await asyncio.to_thread(self.build_index)
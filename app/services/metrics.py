@@ -0,0 +1,152 @@
+import bisect, functools, threading, time
+from contextlib import contextmanager
+
+# In-process metrics rendered in the Prometheus text format at GET /metrics. Metrics
+# register themselves on creation; collectors add values computed at scrape time.
+
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+
+_registry = []
+_collectors = []
+
+def _key(labelnames, labels):
+    return tuple(str(labels[n]) for n in labelnames)
+
+def _fmt_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{n}="{esc(v)}"' for n, v in pairs) + "}"
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        k = _key(self.labelnames, labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self._header() + [f"{self.name}{_fmt_labels(self.labelnames, k)} {v}" for k, v in items]
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount=1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_key(self.labelnames, labels)] = float(value)
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        k = _key(self.labelnames, labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(k) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[i] += 1
+            self._values[k] = (counts, total + value)
+
+    def render(self):
+        with self._lock:
+            items = [(k, (list(c), s)) for k, (c, s) in self._values.items()]
+        lines = self._header()
+        for k, (counts, total) in items:
+            cum = 0
+            for le, n in zip(list(self.buckets) + ["+Inf"], counts):
+                cum += n
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, k, [('le', le)])} {cum}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, k)} {total}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, k)} {cum}")
+        return lines
+
+@contextmanager
+def timer(hist, **labels):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        hist.observe(time.perf_counter() - t0, **labels)
+
+def timed(hist, **labels):
+    """Decorator form of timer() for blocking functions."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with timer(hist, **labels):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency, including the full body of streamed responses", ("method", "route", "status"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served")
+STAGE_SECONDS = Histogram("request_stage_seconds", "Time spent in each stage of a request", ("route", "stage"))
+
+def stage(route, name):
+    """`with metrics.stage("/chat", "llm"):` records the block's duration for that route and stage."""
+    return timer(STAGE_SECONDS, route=route, stage=name)
+
+def collector(fn):
+    """Register `fn() -> [(name, type, help, [(labels dict, value)])]`, evaluated at scrape time."""
+    _collectors.append(fn)
+    return fn
+
+def render():
+    lines = []
+    for m in _registry:
+        lines += m.render()
+    for fn in _collectors:
+        for name, type_, help, samples in fn():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {type_}"]
+            lines += [f"{name}{_fmt_labels(list(l), list(l.values()))} {float(v)}" for l, v in samples]
+    return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """ASGI middleware: in-flight gauge and per-route request latency histogram.
+    Routes are labelled by their path template (/train/{job_id}), not the raw path."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+        async def send_status(msg):
+            nonlocal status
+            if msg["type"] == "http.response.start":
+                status = msg["status"]
+            await send(msg)
+        IN_FLIGHT.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            IN_FLIGHT.dec()
+            # The router records the matched route in the scope.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, method=scope["method"], route=route, status=status)
@@ -0,0 +1,106 @@
+import os, asyncio, json, pickle, threading, time
+
+REGISTRY_PATH = os.getenv("MODEL_REGISTRY_PATH", "./data/models")
+AUTO_PROMOTE = os.getenv("MODEL_AUTO_PROMOTE", "true").lower() == "true"
+
+# (version, model) of the model serving /predict. Replaced by one assignment, so a
+# reader that grabbed it keeps a consistent pair while a promote swaps in the next.
+_current = None
+_loaded = False
+_stamp = None          # _pointer() when _current was read from CURRENT
+_lock = threading.Lock()
+
+def _dir(version):
+    return os.path.join(REGISTRY_PATH, version)
+
+def _pointer():
+    # Every promote replaces CURRENT with a new file, so this changes with each promote,
+    # made by this process or by another worker sharing REGISTRY_PATH.
+    try:
+        st = os.stat(os.path.join(REGISTRY_PATH, "CURRENT"))
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+def versions():
+    """Registered versions, oldest first, with their metadata."""
+    if not os.path.isdir(REGISTRY_PATH):
+        return []
+    out = []
+    for v in sorted(os.listdir(REGISTRY_PATH)):
+        meta = os.path.join(_dir(v), "meta.json")
+        if v.startswith("v") and os.path.exists(meta):
+            with open(meta) as f:
+                out.append({"version": v, **json.load(f)})
+    return out
+
+def register(model_bytes: bytes, meta: dict):
+    """Store a pickled model as the next version. The version directory is written
+    under a temporary name and renamed into place, so it is never seen half-written."""
+    with _lock:
+        os.makedirs(REGISTRY_PATH, exist_ok=True)
+        tmp = os.path.join(REGISTRY_PATH, f".tmp-{os.getpid()}")
+        os.makedirs(tmp, exist_ok=True)
+        with open(os.path.join(tmp, "model.pkl"), "wb") as f:
+            f.write(model_bytes)
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({**meta, "created": time.time()}, f)
+        while True:
+            last = max((int(v[1:]) for v in os.listdir(REGISTRY_PATH) if v.startswith("v") and v[1:].isdigit()), default=0)
+            version = f"v{last + 1:06d}"
+            try:
+                os.rename(tmp, _dir(version))
+                return version
+            except OSError:
+                if not os.path.isdir(_dir(version)):
+                    raise
+                # Another worker registered this number first; take the next one.
+
+def artifact(version):
+    return os.path.join(_dir(version), "model.pkl")
+
+def promote(version):
+    """Load `version` and make it the serving model (hot swap; in-flight requests finish on the old one)."""
+    global _current, _loaded, _stamp
+    with open(artifact(version), "rb") as f:
+        model = pickle.load(f)
+    with _lock:
+        tmp = os.path.join(REGISTRY_PATH, f"CURRENT.tmp-{os.getpid()}")
+        with open(tmp, "w") as f:
+            f.write(version)
+        os.replace(tmp, os.path.join(REGISTRY_PATH, "CURRENT"))
+        _current, _loaded, _stamp = (version, model), True, _pointer()
+    return version
+
+def load():
+    """Load the promoted version recorded on disk; called at startup, and again whenever
+    CURRENT has changed since (a promote in another worker)."""
+    global _current, _loaded, _stamp
+    with _lock:
+        stamp = _pointer()
+        if _loaded and stamp == _stamp:
+            return _current  # loaded by another thread meanwhile
+        if stamp is not None:
+            with open(os.path.join(REGISTRY_PATH, "CURRENT")) as f:
+                version = f.read().strip()
+            if _current is None or _current[0] != version:
+                with open(artifact(version), "rb") as f:
+                    _current = (version, pickle.load(f))
+        _loaded, _stamp = True, stamp
+    return _current
+
+def _fresh():
+    return _loaded and _pointer() == _stamp
+
+def current():
+    """(version, model) serving /predict, or None before anything is trained."""
+    if not _fresh():
+        load()
+    return _current
+
+async def acurrent():
+    """current() for async handlers: a model that needs (re)loading is unpickled in a
+    thread, so only the CURRENT stat runs on the event loop."""
+    if not _fresh():
+        await asyncio.to_thread(load)
+    return _current
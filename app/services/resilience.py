@@ -0,0 +1,118 @@
+import asyncio, threading, time
+from collections import deque
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+def remaining(deadline):
+    """Seconds left before a time.monotonic() deadline (None = no deadline)."""
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("deadline exceeded")
+    return left
+
+class LatencyWindow:
+    """The last `size` latencies of successful calls, for hedge delays."""
+
+    def __init__(self, size=200, min_samples=20):
+        self.min_samples = min_samples
+        self._values = deque(maxlen=size)
+
+    def add(self, seconds):
+        self._values.append(seconds)
+
+    def quantile(self, q):
+        """None until `min_samples` calls have been seen."""
+        values = sorted(self._values)
+        if len(values) < self.min_samples:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+class Breaker:
+    """Consecutive-failure circuit breaker.
+
+    `failures` failures in a row open the circuit and calls are refused. After
+    `reset_after` seconds one probe call is let through (half-open): its success closes
+    the circuit, its failure opens it again. `on_change(state)` is called on transitions.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, failures=5, reset_after=30.0, on_change=None):
+        self.failures = failures
+        self.reset_after = reset_after
+        self.on_change = on_change
+        self.state = self.CLOSED
+        self.consecutive = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set(self, state):
+        if state != self.state:
+            self.state = state
+            if self.on_change:
+                self.on_change(state)
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_after:
+                self._set(self.HALF_OPEN)
+            if self.state == self.CLOSED or (self.state == self.HALF_OPEN and not self._probing):
+                self._probing = self.state == self.HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok):
+        with self._lock:
+            self._probing = False
+            if ok:
+                self.consecutive = 0
+                self._set(self.CLOSED)
+                return
+            self.consecutive += 1
+            if self.state == self.HALF_OPEN or self.consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+                self._set(self.OPEN)
+
+    def release(self):
+        """Give up a call without a verdict (the caller went away): frees the half-open
+        probe so the next call can probe instead."""
+        with self._lock:
+            self._probing = False
+
+    def stats(self):
+        return {"state": self.state, "consecutive_failures": self.consecutive, "rejected": self.rejected}
+
+async def hedged(attempt, delay=None, deadline=None, on_hedge=None):
+    """Await attempt(); if it has not finished after `delay` seconds, start a second one
+    and return whichever succeeds first. The loser is cancelled. Both attempts and the
+    wait are bounded by `deadline`. on_hedge("sent" | "won") reports hedges."""
+    tasks = [asyncio.create_task(attempt())]
+    try:
+        if delay is not None:
+            left = remaining(deadline)
+            if left is None or delay < left:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    tasks.append(asyncio.create_task(attempt()))
+                    on_hedge and on_hedge("sent")
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=remaining(deadline), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded("deadline exceeded")
+            for t in done:
+                if t.exception() is None:
+                    if t is not tasks[0]:
+                        on_hedge and on_hedge("won")
+                    return t.result()
+                error = t.exception()
+        raise error
+    finally:
+        for t in tasks:
+            t.cancel()
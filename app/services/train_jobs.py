@@ -0,0 +1,133 @@
+import os, asyncio, math, multiprocessing, threading, time, uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from app.services import embeddings, features, model_registry, trainer, comet_tracker, aci_client
+
+WORKERS = int(os.getenv("TRAIN_WORKERS", "1"))
+MAX_PENDING = int(os.getenv("TRAIN_MAX_PENDING", "8"))
+HISTORY = int(os.getenv("TRAIN_JOB_HISTORY", "100"))
+EMBED_CHUNK = int(os.getenv("TRAIN_EMBED_CHUNK", "1024"))
+
+ACTIVE = ("queued", "embedding", "training")
+
+class QueueFull(RuntimeError):
+    def __init__(self, msg, retry_after):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+jobs = OrderedDict()   # job id -> public job record
+_tasks = {}            # job id -> asyncio task
+rejected = 0           # submits refused with QueueFull
+_pool = None
+_slots = None
+_loop = None
+
+def _executor():
+    # Spawned (not forked) workers: forking a process that holds torch threads is unsafe.
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def _semaphore():
+    # One slot per worker: at most WORKERS jobs embed or fit at once, the rest wait queued.
+    global _slots, _loop
+    loop = asyncio.get_running_loop()
+    if _loop is not loop:
+        _loop, _slots = loop, asyncio.Semaphore(WORKERS)
+    return _slots
+
+def _prune():
+    done = [i for i, j in jobs.items() if j["status"] not in ACTIVE]
+    for i in done[:max(0, len(done) - HISTORY)]:
+        del jobs[i]
+
+def submit(texts, labels):
+    """Queue a training job and return its record; raises QueueFull past WORKERS + MAX_PENDING."""
+    global rejected
+    if sum(1 for j in jobs.values() if j["status"] in ACTIVE) >= WORKERS + MAX_PENDING:
+        rejected += 1
+        raise QueueFull(f"{WORKERS + MAX_PENDING} training jobs already queued or running", retry_after())
+    job = {"id": uuid.uuid4().hex, "status": "queued", "total": len(texts), "embedded": 0,
+           "result": None, "error": None, "created": time.time(), "started": None, "finished": None}
+    jobs[job["id"]] = job
+    _prune()
+    task = asyncio.create_task(_run(job, list(texts), list(labels)))
+    _tasks[job["id"]] = task
+    task.add_done_callback(lambda _: _tasks.pop(job["id"], None))
+    return job
+
+def get(job_id):
+    return jobs.get(job_id)
+
+def cancel(job_id):
+    """Cancel a queued or running job. Embedding stops after the chunk being encoded;
+    a fit already running in a worker process is left to finish there, but its result
+    is discarded and no model is registered."""
+    job = jobs.get(job_id)
+    task = _tasks.get(job_id)
+    if job is not None and task is not None:
+        task.cancel()
+    return job
+
+class _Stopped(Exception):
+    pass
+
+async def _features(job, texts):
+    # Cancelling the await does not stop the thread, so it checks a flag between chunks.
+    stop = threading.Event()
+    def progress(n):
+        job["embedded"] = n
+        if stop.is_set():
+            raise _Stopped()
+    try:
+        return await asyncio.to_thread(features.cache().extract, texts, chunk=EMBED_CHUNK, progress=progress)
+    except asyncio.CancelledError:
+        stop.set()
+        raise
+
+async def _run(job, texts, labels):
+    try:
+        async with _semaphore():
+            job["status"], job["started"] = "embedding", time.time()
+            X = await _features(job, texts)
+            job["status"] = "training"
+            res = await asyncio.wrap_future(_executor().submit(trainer.fit, X, np.asarray(labels)))
+            meta = {"model": "logreg", "embed_model": embeddings.MODEL_TAG, "job": job["id"], "examples": len(texts),
+                    "seconds": res["seconds"], "accuracy": res["accuracy"]}
+            version = await asyncio.to_thread(model_registry.register, res["model"], meta)
+            if model_registry.AUTO_PROMOTE:
+                await asyncio.to_thread(model_registry.promote, version)
+            comet_tracker.log_parameters({"model":"logreg"})
+            comet_tracker.log_metric("train_seconds", res["seconds"])
+            comet_tracker.log_metric("accuracy", res["accuracy"])
+            comet_tracker.log_asset(model_registry.artifact(version))
+            aci_client.track("train", {"job":job["id"],"version":version,"latency":res["seconds"],"accuracy":res["accuracy"]})
+            job["result"] = {"version": version, "seconds": res["seconds"], "accuracy": res["accuracy"]}
+            job["status"] = "done"
+    except asyncio.CancelledError:
+        job["status"] = "cancelled"
+    except Exception as e:
+        job["status"], job["error"] = "failed", str(e)
+    finally:
+        job["finished"] = time.time()
+
+def retry_after():
+    """Typical seconds until a worker frees up: the mean recent job duration, rounded up."""
+    took = [j["finished"] - j["started"] for j in jobs.values() if j["finished"] and j["started"]]
+    return max(1, math.ceil(sum(took) / len(took) / WORKERS)) if took else 10
+
+def stats():
+    counts = {}
+    for j in jobs.values():
+        counts[j["status"]] = counts.get(j["status"], 0) + 1
+    return {"workers": WORKERS, "max_pending": MAX_PENDING, "jobs": counts, "rejected": rejected}
+
+async def stop():
+    global _pool
+    for task in list(_tasks.values()):
+        task.cancel()
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await asyncio.to_thread(pool.shutdown, wait=False, cancel_futures=True)
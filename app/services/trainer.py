@@ -0,0 +1,17 @@
+import pickle, time
+import numpy as np
+
+# Runs inside train_jobs' worker processes. Each worker is spawned fresh and imports
+# this module, so keep it free of the API's heavy imports (torch, the embedding model).
+
+def fit(X, y, test_size=0.3, seed=42):
+    """Train/test split + logistic regression. Returns timings, accuracy and the pickled model."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import accuracy_score
+    Xtr, Xte, ytr, yte = train_test_split(X, np.asarray(y), test_size=test_size, random_state=seed)
+    t0 = time.time()
+    clf = LogisticRegression(max_iter=200).fit(Xtr, ytr)
+    dt = time.time() - t0
+    acc = float(accuracy_score(yte, clf.predict(Xte)))
+    return {"seconds": dt, "accuracy": acc, "model": pickle.dumps(clf)}
@@ -0,0 +1,85 @@
+import os, hashlib, uuid
+from app.services import metrics
+
+BACKEND = os.getenv("VECTOR_STORE", "weaviate")
+LOCAL_PATH = os.getenv("LOCAL_STORE_PATH", "./data/vectors")
+LOCAL_DTYPE = os.getenv("LOCAL_STORE_DTYPE", "float32")
+LOCAL_INDEX = os.getenv("LOCAL_STORE_INDEX", "exact")
+LOCAL_NLIST = int(os.getenv("LOCAL_STORE_NLIST", "0"))
+LOCAL_NPROBE = int(os.getenv("LOCAL_STORE_NPROBE", "8"))
+
+_store = None
+
+OP_SECONDS = metrics.Histogram("vector_store_seconds", "Vector store call latency", ("backend", "op"))
+
+def doc_id(text: str):
+    # SHA1 of the text, shaped as a UUID so Weaviate accepts it as an object id
+    return str(uuid.UUID(hashlib.sha1(text.encode("utf-8")).hexdigest()[:32]))
+
+class VectorStore:
+    """What the routes need from a vector backend. Methods are blocking; call them via asyncio.to_thread."""
+
+    def open(self):
+        """Connect / load and make sure the collection exists."""
+
+    def close(self):
+        pass
+
+    async def maintain(self):
+        """Long-running background upkeep started by the app lifespan (health checks, index rebuilds)."""
+
+    def upsert_many(self, texts, vectors, ids=None, metas=None):
+        """Write texts with their vectors. `ids` default to doc_id(text); `metas` are optional
+        per-item chunk provenance dicts (parent_id, start, end). Returns (ids, {index: error message})."""
+        raise NotImplementedError
+
+    def existing_ids(self, ids):
+        raise NotImplementedError
+
+    def search(self, vector, k=5, with_vectors=False):
+        """Returns [{"id", "text", "score", ...meta}] best first; score is cosine similarity.
+        `with_vectors` adds each hit's stored "vector"."""
+        raise NotImplementedError
+
+    def search_many(self, vectors, ks):
+        """search() for several queries at once; one hit list per query, in input order."""
+        return [self.search(v, k) for v, k in zip(vectors, ks)]
+
+class WeaviateStore(VectorStore):
+    def __init__(self):
+        from app.services import weav_client
+        self.w = weav_client
+
+    def open(self):
+        self.w.ensure_schema()
+
+    def close(self):
+        self.w.close()
+
+    async def maintain(self):
+        await self.w.health_loop()
+
+    def upsert_many(self, texts, vectors, ids=None, metas=None):
+        return self.w.upsert_many(texts, vectors, ids, metas)
+
+    def existing_ids(self, ids):
+        return self.w.existing_ids(ids)
+
+    def search(self, vector, k=5, with_vectors=False):
+        return self.w.search(vector, k=k, with_vectors=with_vectors)
+
+    def search_many(self, vectors, ks):
+        return self.w.search_many(vectors, ks)
+
+def get():
+    """The configured backend (VECTOR_STORE=weaviate|local), created on first use."""
+    global _store
+    if _store is None:
+        if BACKEND == "local":
+            from app.services.local_store import LocalStore
+            _store = LocalStore(LOCAL_PATH, dtype=LOCAL_DTYPE, index=LOCAL_INDEX, nlist=LOCAL_NLIST, nprobe=LOCAL_NPROBE)
+        elif BACKEND == "weaviate":
+            _store = WeaviateStore()
+        else:
+            raise RuntimeError(f"Unknown VECTOR_STORE {BACKEND!r}; expected 'weaviate' or 'local'")
+    return _store
@@ -0,0 +1,47 @@
+import os, asyncio, time
+from app.services import embeddings, vector_store, model_registry
+
+ENABLED = os.getenv("WARMUP", "true").lower() == "true"
+RETRY_INTERVAL = float(os.getenv("WARMUP_RETRY_INTERVAL", "5"))
+
+# Readiness for GET /ready: each step's duration once it has succeeded, and the last
+# error of any step still failing. Without WARMUP everything loads on first use.
+state = {"ready": not ENABLED, "steps": {}, "errors": {}}
+
+async def _embeddings():
+    # Through the micro-batcher, so its encode thread is the one that gets warmed.
+    await embeddings.aembed("warmup")
+
+async def _vector_store():
+    store = vector_store.get()
+    await asyncio.to_thread(store.open)
+    await asyncio.to_thread(store.search, await embeddings.aembed("warmup"), 1)
+
+async def _model():
+    await asyncio.to_thread(model_registry.load)
+
+STEPS = [("embeddings", _embeddings), ("vector_store", _vector_store), ("model", _model)]
+
+async def run():
+    """Load the model, connect the vector store and run a dummy encode + search, retrying
+    failed steps every RETRY_INTERVAL seconds; marks the process ready once all pass."""
+    if not ENABLED:
+        return
+    pending = list(STEPS)
+    while pending:
+        for step in list(pending):
+            name, fn = step
+            t0 = time.perf_counter()
+            try:
+                await fn()
+            except Exception as e:
+                if name not in state["errors"]:
+                    print(f"Warning: warmup step {name} failed ({e}); retrying every {RETRY_INTERVAL}s")
+                state["errors"][name] = str(e)
+                continue
+            state["steps"][name] = time.perf_counter() - t0
+            state["errors"].pop(name, None)
+            pending.remove(step)
+        if pending:
+            await asyncio.sleep(RETRY_INTERVAL)
+    state["ready"] = True
@@ -1,44 +1,155 @@
-import os, weaviate
-from weaviate.classes.config import Property, DataType
+import os, asyncio, threading, weaviate
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from weaviate.classes.config import Configure, Property, DataType
+from weaviate.classes.data import DataObject
 from weaviate.classes.init import Auth
+from weaviate.classes.query import Filter
+from weaviate.connect.base import ConnectionParams
+from weaviate.exceptions import WeaviateClosedClientError, WeaviateConnectionError
+from app.services import metrics
+from app.services.vector_store import OP_SECONDS, doc_id
 
 WEAV_CLASS = "Document"
+GRPC_PORT = int(os.getenv("WEAVIATE_GRPC_PORT", "50051"))
+HEALTH_INTERVAL = float(os.getenv("WEAVIATE_HEALTH_INTERVAL", "15"))
+SEARCH_CONCURRENCY = int(os.getenv("WEAVIATE_SEARCH_CONCURRENCY", "8"))
 
-def client():
+_client = None
+_schema_ready = False
+_search_pool = None
+_lock = threading.Lock()
+
+def _connect():
     url = os.getenv("WEAVIATE_URL")
     api_key = os.getenv("WEAVIATE_API_KEY")
     if not url:
         raise RuntimeError("WEAVIATE_URL not set. Please set it in .env file.")
     auth = Auth.api_key(api_key) if api_key else None
     try:
-        return weaviate.WeaviateClient(url=url, auth_client_secret=auth)
+        c = weaviate.WeaviateClient(connection_params=ConnectionParams.from_url(url, grpc_port=GRPC_PORT), auth_client_secret=auth)
+        c.connect()
+        return c
     except Exception as e:
         raise RuntimeError(f"Failed to connect to Weaviate at {url}: {e}")
 
+def client():
+    """The process-wide client; connects on first use and after a reset."""
+    global _client
+    with _lock:
+        if _client is None or not _client.is_connected():
+            _client = _connect()
+        return _client
+
+def reset():
+    """Drop the current connection; the next client() call reconnects."""
+    global _client, _schema_ready
+    with _lock:
+        c, _client = _client, None
+        _schema_ready = False
+    if c is not None:
+        try: c.close()
+        except Exception: pass
+
+close = reset
+
+def healthy():
+    try:
+        return client().is_ready()
+    except Exception:
+        return False
+
+async def health_loop():
+    # Reconnect in the background so a dead connection is not discovered on the request path.
+    while True:
+        await asyncio.sleep(HEALTH_INTERVAL)
+        if not await asyncio.to_thread(healthy):
+            reset()
+
+def _retrying(fn):
+    try:
+        return fn()
+    except (WeaviateConnectionError, WeaviateClosedClientError):
+        reset()
+        return fn()
+
+def invalidate_schema():
+    global _schema_ready
+    _schema_ready = False
+
+PROPERTIES = [
+    Property(name="text", data_type=DataType.TEXT),
+    # Chunk provenance: the source document's id and the chunk's character span in it
+    Property(name="parent_id", data_type=DataType.TEXT),
+    Property(name="start", data_type=DataType.INT),
+    Property(name="end", data_type=DataType.INT),
+]
+
+def _vectors():
+    # We bring our own vectors; the dimension is taken from the first insert.
+    if hasattr(Configure, "Vectors"):
+        return {"vector_config": Configure.Vectors.self_provided()}
+    return {"vectorizer_config": Configure.Vectorizer.none()}  # clients before 4.16
+
 def ensure_schema(dim=384):
-    c = client()
-    schema = c.collections
-    if WEAV_CLASS not in [col.name for col in schema.list_all()]:
-        schema.create(
-            name=WEAV_CLASS,
-            properties=[
-                Property(name="text", data_type=DataType.TEXT)
-            ],
-            vectorizer_config={"vectorizer": "none", "dimensions": dim},
-        )
-
-def upsert(text: str, embedding):
-    import hashlib
-    ensure_schema(dim=len(embedding))
-    c = client().collections.get(WEAV_CLASS)
-    uid = hashlib.sha1(text.encode("utf-8")).hexdigest()
-    c.data.insert(uuid=uid, properties={"text": text}, vector=embedding)
-    return uid
-
-def search(query_embedding, k=5):
-    c = client().collections.get(WEAV_CLASS)
-    res = c.query.near_vector(query_embedding, limit=k, return_metadata=["distance"])
+    global _schema_ready
+    if _schema_ready:
+        return
+    schema = client().collections
+    if not schema.exists(WEAV_CLASS):
+        schema.create(name=WEAV_CLASS, properties=PROPERTIES, **_vectors())
+    else:
+        col = schema.get(WEAV_CLASS)
+        have = {p.name for p in col.config.get().properties}
+        for prop in PROPERTIES:
+            if prop.name not in have:
+                col.config.add_property(prop)
+    _schema_ready = True
+
+@metrics.timed(OP_SECONDS, backend="weaviate", op="upsert_many")
+def upsert_many(texts, embeddings, ids=None, metas=None):
+    """Write a batch in one insert_many call. Returns (ids, {index: error message})."""
+    if not texts:
+        return [], {}
+    ids = ids or [doc_id(t) for t in texts]
+    metas = metas or [{}] * len(texts)
+    def write():
+        ensure_schema(dim=len(embeddings[0]))
+        return client().collections.get(WEAV_CLASS).data.insert_many(
+            [DataObject(properties={"text": t, **m}, uuid=u, vector=v) for t, u, v, m in zip(texts, ids, embeddings, metas)])
+    res = _retrying(write)
+    return ids, {i: e.message for i, e in res.errors.items()}
+
+@metrics.timed(OP_SECONDS, backend="weaviate", op="existing_ids")
+def existing_ids(ids):
+    """The subset of `ids` already stored, found with one filtered query."""
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return set()
+    def fetch():
+        ensure_schema()
+        return client().collections.get(WEAV_CLASS).query.fetch_objects(
+            filters=Filter.by_id().contains_any(ids), limit=len(ids), return_properties=[])
+    return {str(o.uuid) for o in _retrying(fetch).objects}
+
+@metrics.timed(OP_SECONDS, backend="weaviate", op="search")
+def search(query_embedding, k=5, with_vectors=False):
+    res = _retrying(lambda: client().collections.get(WEAV_CLASS).query.near_vector(query_embedding, limit=k, return_metadata=["distance"], include_vector=with_vectors))
     out=[]
     for o in res.objects:
-        out.append({"text": o.properties.get("text",""), "score": 1.0 - float(o.metadata.get("distance",0.0))})
+        hit = {"id": str(o.uuid), "text": o.properties.get("text",""), "score": 1.0 - float(o.metadata.distance or 0.0)}
+        hit.update({k: o.properties[k] for k in ("parent_id", "start", "end") if o.properties.get(k) is not None})
+        if with_vectors:
+            vec = o.vector.get("default") if isinstance(o.vector, dict) else o.vector
+            hit["vector"] = np.asarray(vec, dtype=np.float32)
+        out.append(hit)
     return out
+
+def search_many(vectors, ks):
+    """Concurrent near_vector queries over the shared client (Weaviate has no multi-vector
+    query); results come back in input order."""
+    global _search_pool
+    with _lock:
+        if _search_pool is None:
+            _search_pool = ThreadPoolExecutor(max_workers=SEARCH_CONCURRENCY, thread_name_prefix="weaviate-search")
+    return list(_search_pool.map(search, vectors, ks))
@@ -0,0 +1,84 @@
+"""Parity and throughput of the embedding backends against PyTorch fp32.
+
+    python -m bench.embed_backends --backends torch,int8,onnx --threads 1 [--corpus texts.txt]
+
+Prints one JSON report: per backend, load time, batch throughput (texts/sec), single-text
+latency percentiles, and cosine drift (1 - cos) of each vector against the fp32 one.
+"""
+import argparse, json, random, time
+import numpy as np
+from app.services import embed_backends
+from app.services.embeddings import MODEL_ID
+
+def sample_corpus(n, seed=0):
+    rng = random.Random(seed)
+    subjects = ["The vector database", "Our training job", "The chat endpoint", "A customer", "The nightly ingest",
+                "Comet", "The search index", "This release", "The on-call engineer", "A long support thread"]
+    verbs = ["stores", "tracks", "summarizes", "retries", "rejects", "embeds", "streams", "caches", "ranks", "reports"]
+    objects = ["millions of documents", "experiment metrics", "a confusing error message", "every failed request",
+               "product reviews in three languages", "the top five passages", "latency percentiles per stage",
+               "duplicated uploads", "questions about billing", "stale model versions"]
+    tails = ["", " before the deadline.", " whenever the queue backs up.", " and nobody noticed for a week.",
+             " with surprisingly little memory.", " -- see the incident notes for the full timeline of events."]
+    return [f"{rng.choice(subjects)} {rng.choice(verbs)} {rng.choice(objects)}{rng.choice(tails)}" * rng.randint(1, 4)
+            for _ in range(n)]
+
+def percentile(xs, p):
+    return float(np.percentile(np.asarray(xs) * 1000, p))
+
+def run(backend, texts, threads, batch, latency_samples):
+    t0 = time.perf_counter()
+    model = embed_backends.load(backend, MODEL_ID, threads)
+    load_s = time.perf_counter() - t0
+    model.encode(texts[:batch], batch_size=batch)  # warmup
+    t0 = time.perf_counter()
+    vecs = np.asarray(model.encode(texts, batch_size=batch), dtype=np.float32)
+    bulk_s = time.perf_counter() - t0
+    lat = []
+    for t in texts[:latency_samples]:
+        t0 = time.perf_counter()
+        model.encode([t])
+        lat.append(time.perf_counter() - t0)
+    return vecs, {"load_seconds": load_s, "texts_per_sec": len(texts) / bulk_s,
+                  "latency_ms": {"p50": percentile(lat, 50), "p95": percentile(lat, 95), "p99": percentile(lat, 99)}}
+
+def drift(vecs, ref):
+    a = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+    b = ref / np.linalg.norm(ref, axis=1, keepdims=True)
+    d = 1.0 - (a * b).sum(axis=1)
+    return {"mean": float(d.mean()), "p99": float(np.percentile(d, 99)), "max": float(d.max())}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--backends", default=",".join(embed_backends.BACKENDS))
+    ap.add_argument("--corpus", help="text file, one document per line (default: synthetic sample)")
+    ap.add_argument("--n", type=int, default=1000, help="documents in the synthetic sample")
+    ap.add_argument("--threads", type=int, default=1, help="intra-op threads per backend (per-core numbers at 1)")
+    ap.add_argument("--batch", type=int, default=64)
+    ap.add_argument("--latency-samples", type=int, default=200)
+    args = ap.parse_args()
+
+    if args.corpus:
+        with open(args.corpus) as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = sample_corpus(args.n)
+    report = {"model": MODEL_ID, "docs": len(texts), "threads": args.threads, "batch": args.batch, "backends": {}}
+    ref, results = None, {}
+    # fp32 always runs first: it is the parity reference.
+    for name in ["torch"] + [b for b in args.backends.split(",") if b != "torch"]:
+        try:
+            vecs, stats = run(name, texts, args.threads, args.batch, args.latency_samples)
+        except Exception as e:
+            results[name] = {"error": str(e)}
+            continue
+        if name == "torch":
+            ref = vecs
+        stats["cosine_drift"] = drift(vecs, ref) if ref is not None else None
+        stats["speedup_vs_fp32"] = stats["texts_per_sec"] / results["torch"]["texts_per_sec"] if "torch" in results else 1.0
+        results[name] = stats
+    report["backends"] = results
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Local stand-ins for the Friendli chat API and the ACI collector, with injected latency and errors.
+
+    python -m bench.fakes --port 9100 --llm-latency-ms 300 --llm-error-rate 0.01
+
+Friendli: POST /v1/chat/completions (JSON, or OpenAI-style SSE when "stream": true).
+ACI:      POST /aci/events
+"""
+import argparse, asyncio, json, random
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+class Upstream:
+    def __init__(self, latency_ms=0.0, jitter=0.5, error_rate=0.0):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+
+    async def delay(self, scale=1.0):
+        if self.latency:
+            await asyncio.sleep(scale * self.latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def fail(self):
+        self.calls += 1
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return True
+        return False
+
+def make_app(llm: Upstream, aci: Upstream, tokens=32):
+    app = FastAPI()
+    events = {"received": 0}
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        if llm.fail():
+            await llm.delay(0.2)
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+        words = [f"tok{i}" for i in range(tokens)]
+        if not body.get("stream"):
+            await llm.delay()
+            return {"choices": [{"message": {"content": " ".join(words)}}]}
+
+        async def sse():
+            # Time to first token is ~30% of the latency, the rest is spread over the tokens.
+            await llm.delay(0.3)
+            for w in words:
+                yield f"data: {json.dumps({'choices': [{'delta': {'content': w + ' '}}]})}\n\n"
+                await llm.delay(0.7 / tokens)
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+    @app.post("/aci/events")
+    async def collect(request: Request):
+        body = await request.json()
+        await aci.delay()
+        if aci.fail():
+            return JSONResponse({"error": "injected failure"}, status_code=503)
+        events["received"] += len(body.get("events", []))
+        return {"ok": True}
+
+    @app.get("/stats")
+    def stats():
+        return {"llm": {"calls": llm.calls, "errors": llm.errors}, "aci": {"calls": aci.calls, "errors": aci.errors, **events}}
+
+    return app
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9100)
+    ap.add_argument("--llm-latency-ms", type=float, default=300)
+    ap.add_argument("--llm-error-rate", type=float, default=0.0)
+    ap.add_argument("--llm-tokens", type=int, default=32)
+    ap.add_argument("--aci-latency-ms", type=float, default=20)
+    ap.add_argument("--aci-error-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    import uvicorn
+    app = make_app(Upstream(args.llm_latency_ms, error_rate=args.llm_error_rate),
+                   Upstream(args.aci_latency_ms, error_rate=args.aci_error_rate), args.llm_tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Load test: starts the fake upstreams and the app, then drives /ingest, /search, /chat
+and /train at a fixed concurrency and reports latency percentiles and requests/sec.
+
+    python -m bench.loadtest --requests 500 --concurrency 32 --fake-embeddings
+    python -m bench.loadtest --baseline bench/results/<older>.json
+
+Results are written as JSON to bench/results/<commit>-<timestamp>.json (or --out), so
+runs from different commits can be compared with --baseline.
+"""
+import argparse, asyncio, json, os, random, subprocess, sys, tempfile, time
+from collections import Counter
+import httpx
+import numpy as np
+
+SCENARIOS = ("ingest", "search", "chat", "train")
+WORDS = ("vector database embedding cluster latency throughput model training label query answer context "
+         "document search index shard replica cache batch stream token prompt metric experiment").split()
+
+def sentence(rng, n=12):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+def summarize(latencies, codes, wall):
+    ms = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+    ok = sum(n for c, n in codes.items() if isinstance(c, int) and c < 400)
+    return {"requests": sum(codes.values()), "ok": ok, "errors": sum(codes.values()) - ok,
+            "status": {str(c): n for c, n in codes.items()}, "seconds": wall,
+            "rps": sum(codes.values()) / wall if wall else 0.0,
+            "latency_ms": {"p50": float(np.percentile(ms, 50)), "p95": float(np.percentile(ms, 95)),
+                           "p99": float(np.percentile(ms, 99)), "max": float(ms.max())}}
+
+async def drive(client, request, n, concurrency):
+    """Run `request(client, i)` for i in range(n) from `concurrency` workers."""
+    latencies, codes, responses = [], Counter(), []
+    todo = iter(range(n))
+
+    async def worker():
+        for i in todo:
+            t0 = time.perf_counter()
+            try:
+                r = await request(client, i)
+            except httpx.HTTPError as e:
+                codes[type(e).__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+            codes[r.status_code] += 1
+            responses.append(r)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, codes, time.perf_counter() - t0), responses
+
+def requests_for(scenario, seed):
+    rng = random.Random(seed)
+    if scenario == "ingest":
+        # Unique texts, so no request is short-circuited as an already-stored document.
+        return lambda c, i: c.post("/ingest", json={"text": f"{i} {seed} {sentence(rng, 40)}"})
+    if scenario == "search":
+        return lambda c, i: c.get("/search", params={"q": sentence(rng, 6), "k": 5})
+    if scenario == "chat":
+        return lambda c, i: c.post("/chat", json={"message": sentence(rng, 10), "k": 3})
+    if scenario == "train":
+        def train(c, i):
+            pairs = [{"text": sentence(rng, 8), "label": n % 2} for n in range(64)]
+            return c.post("/train", json={"labelled_pairs": pairs})
+        return train
+
+async def wait_jobs(client, ids, timeout):
+    """Poll submitted training jobs to the end; job durations are reported next to the HTTP numbers."""
+    deadline = time.monotonic() + timeout
+    jobs = {}
+    while ids and time.monotonic() < deadline:
+        for job_id in list(ids):
+            j = (await client.get(f"/train/{job_id}")).json()
+            if j["status"] not in ("queued", "embedding", "training"):
+                jobs[job_id] = j
+                ids.discard(job_id)
+        await asyncio.sleep(0.2)
+    took = [j["finished"] - j["created"] for j in jobs.values() if j["status"] == "done"]
+    return {"done": len(took), "failed": sum(1 for j in jobs.values() if j["status"] == "failed"), "unfinished": len(ids),
+            "job_seconds_p50": float(np.percentile(took, 50)) if took else None,
+            "job_seconds_p95": float(np.percentile(took, 95)) if took else None}
+
+async def wait_ready(base, proc, timeout):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base) as c:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with {proc.returncode}")
+            try:
+                if (await c.get("/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{base} not ready after {timeout}s")
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def compare(report, baseline):
+    for name, cur in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        print(f"{name:7s} rps {old['rps']:9.1f} -> {cur['rps']:9.1f} ({cur['rps'] / max(old['rps'], 1e-9):5.2f}x)   "
+              f"p95 {old['latency_ms']['p95']:8.1f} -> {cur['latency_ms']['p95']:8.1f} ms   "
+              f"p99 {old['latency_ms']['p99']:8.1f} -> {cur['latency_ms']['p99']:8.1f} ms", file=sys.stderr)
+
+async def run(args):
+    tmp = tempfile.mkdtemp(prefix="loadtest-")
+    fakes_url = f"http://127.0.0.1:{args.fakes_port}"
+    app_url = f"http://127.0.0.1:{args.port}"
+    env = {**os.environ,
+           "FRIENDLI_API_URL": f"{fakes_url}/v1/chat/completions", "FRIENDLI_API_KEY": "bench",
+           "ACI_COLLECTOR_URL": f"{fakes_url}/aci/events", "ACI_API_KEY": "bench",
+           "COMET_API_KEY": "", "WARMUP": "true",
+           "BENCH_VS_PATH": os.path.join(tmp, "vectors"), "BENCH_VS_LATENCY_MS": str(args.vs_latency_ms),
+           "BENCH_VS_ERROR_RATE": str(args.vs_error_rate), "BENCH_FAKE_EMBEDDINGS": "1" if args.fake_embeddings else "0",
+           "FEATURE_CACHE_PATH": os.path.join(tmp, "features"), "MODEL_REGISTRY_PATH": os.path.join(tmp, "models"),
+           "ANSWER_CACHE_SIZE": str(args.answer_cache_size)}
+    fakes = subprocess.Popen([sys.executable, "-m", "bench.fakes", "--port", str(args.fakes_port),
+                              "--llm-latency-ms", str(args.llm_latency_ms), "--llm-error-rate", str(args.llm_error_rate),
+                              "--aci-latency-ms", str(args.aci_latency_ms), "--aci-error-rate", str(args.aci_error_rate)])
+    server = subprocess.Popen([sys.executable, "-m", "bench.serve", "--port", str(args.port)], env=env)
+    try:
+        await wait_ready(app_url, server, args.startup_timeout)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        report = {"commit": git_commit(), "time": time.time(), "config": vars(args), "scenarios": {}}
+        async with httpx.AsyncClient(base_url=app_url, timeout=args.timeout, limits=limits) as client:
+            # Seed the store so /search and /chat retrieve from a non-trivial corpus.
+            rng = random.Random(0)
+            for start in range(0, args.corpus, 256):
+                docs = [{"text": f"seed {n} {sentence(rng, 40)}"} for n in range(start, min(args.corpus, start + 256))]
+                (await client.post("/ingest/batch", json=docs)).raise_for_status()
+            for name in args.scenarios.split(","):
+                n = args.train_requests if name == "train" else args.requests
+                summary, responses = await drive(client, requests_for(name, args.seed), n, args.concurrency)
+                if name == "train":
+                    ids = {r.json()["job_id"] for r in responses if r.status_code == 202}
+                    summary["jobs"] = await wait_jobs(client, ids, args.timeout * 10)
+                report["scenarios"][name] = summary
+                print(f"{name:7s} {summary['rps']:8.1f} req/s  p50 {summary['latency_ms']['p50']:7.1f}  "
+                      f"p95 {summary['latency_ms']['p95']:7.1f}  p99 {summary['latency_ms']['p99']:7.1f} ms  "
+                      f"errors {summary['errors']}", file=sys.stderr)
+            report["app_stats"] = (await client.get("/stats")).json()
+        async with httpx.AsyncClient(base_url=fakes_url) as c:
+            report["upstream_stats"] = (await c.get("/stats")).json()
+        return report
+    finally:
+        server.terminate()
+        fakes.terminate()
+        server.wait(30)
+        fakes.wait(30)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS))
+    ap.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    ap.add_argument("--train-requests", type=int, default=8)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--corpus", type=int, default=2000, help="documents ingested before the scenarios run")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--startup-timeout", type=float, default=300.0)
+    ap.add_argument("--port", type=int, default=8090)
+    ap.add_argument("--fakes-port", type=int, default=9100)
+    ap.add_argument("--fake-embeddings", action="store_true", help="hash-seeded vectors instead of the model")
+    ap.add_argument("--answer-cache-size", type=int, default=0, help="0 so every /chat reaches the LLM")
+    ap.add_argument("--vs-latency-ms", type=float, default=5.0)
+    ap.add_argument("--vs-error-rate", type=float, default=0.0)
+    ap.add_argument("--llm-latency-ms", type=float, default=300.0)
+    ap.add_argument("--llm-error-rate", type=float, default=0.0)
+    ap.add_argument("--aci-latency-ms", type=float, default=20.0)
+    ap.add_argument("--aci-error-rate", type=float, default=0.0)
+    ap.add_argument("--out", help="JSON report path (default bench/results/<commit>-<timestamp>.json)")
+    ap.add_argument("--baseline", help="earlier JSON report to compare against")
+    args = ap.parse_args()
+
+    report = asyncio.run(run(args))
+    out = args.out or os.path.join("bench", "results", f"{report['commit']}-{int(report['time'])}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {out}", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
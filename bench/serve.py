@@ -0,0 +1,76 @@
+"""Run the app for load tests, with the vector store replaced by a local one that
+injects latency and errors (a stand-in for Weaviate, whose v4 client speaks gRPC).
+
+    BENCH_VS_LATENCY_MS=5 BENCH_VS_ERROR_RATE=0 python -m bench.serve --port 8090
+
+BENCH_FAKE_EMBEDDINGS=1 also swaps the sentence-transformer for hash-seeded random
+vectors, to measure the service itself without model compute (or a model download).
+"""
+import argparse, hashlib, os, random, re, tempfile, time
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services import embeddings, vector_store
+from app.services.local_store import LocalStore
+
+class FakeVectorStore(LocalStore):
+    def __init__(self, path, latency_ms=0.0, error_rate=0.0, dim=384):
+        super().__init__(path, dim=dim)
+        self.latency = latency_ms / 1000.0
+        self.error_rate = error_rate
+
+    def _remote(self, op):
+        # Store methods run in worker threads, like the blocking Weaviate client calls they model.
+        if self.latency:
+            time.sleep(self.latency * random.uniform(0.5, 1.5))
+        if random.random() < self.error_rate:
+            raise RuntimeError(f"injected {op} failure")
+
+    def upsert_many(self, texts, vectors, ids=None, metas=None):
+        self._remote("insert_many")
+        return super().upsert_many(texts, vectors, ids, metas)
+
+    def existing_ids(self, ids):
+        self._remote("fetch_objects")
+        return super().existing_ids(ids)
+
+    def search(self, vector, k=5, with_vectors=False):
+        self._remote("near_vector")
+        return super().search(vector, k, with_vectors)
+
+class _WordTokenizer:
+    def __call__(self, text, **kwargs):
+        return {"offset_mapping": [m.span() for m in re.finditer(r"\S+", text)]}
+
+class FakeEncoder:
+    tokenizer = _WordTokenizer()
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha1(t.encode("utf-8")).digest()[:8], "little")
+            out[i] = np.random.default_rng(seed).standard_normal(self.dim)
+        return out / np.linalg.norm(out, axis=1, keepdims=True)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8090)
+    args = ap.parse_args()
+    path = os.getenv("BENCH_VS_PATH") or tempfile.mkdtemp(prefix="bench-vectors-")
+    vector_store._store = FakeVectorStore(path, float(os.getenv("BENCH_VS_LATENCY_MS", "0")),
+                                          float(os.getenv("BENCH_VS_ERROR_RATE", "0")))
+    if os.getenv("BENCH_FAKE_EMBEDDINGS") == "1":
+        encoder = FakeEncoder()
+        embeddings.get_model = lambda: encoder
+    import uvicorn
+    from app.main import app
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import asyncio
+from app.services import aci_client
+
+def test_events_are_batched_and_overflow_is_dropped(monkeypatch):
+    posted = []
+    async def post(batch):
+        posted.append(list(batch))
+    monkeypatch.setattr(aci_client, "URL", "http://collector")
+    monkeypatch.setattr(aci_client, "KEY", "k")
+    monkeypatch.setattr(aci_client, "QUEUE_SIZE", 5)
+    monkeypatch.setattr(aci_client, "BATCH_SIZE", 3)
+    monkeypatch.setattr(aci_client, "_post", post)
+    monkeypatch.setattr(aci_client, "counters", {"sent": 0, "dropped": 0, "failed": 0})
+
+    async def run():
+        for i in range(7):
+            aci_client.track("e", {"i": i})
+        await aci_client.stop(deadline=1.0)
+
+    asyncio.run(run())
+    assert aci_client.counters["dropped"] == 2
+    assert [len(b) for b in posted] == [3, 2]
+    assert [e["payload"]["i"] for b in posted for e in b] == [0, 1, 2, 3, 4]
@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import admission
+
+client = TestClient(app)
+
+def _limiter(slots=1, queue=4):
+    return admission.Limiter(slots, {"search": {"priority": 0, "concurrency": slots, "queue": queue},
+                                     "ingest": {"priority": 1, "concurrency": slots, "queue": queue}})
+
+def test_waiting_search_overtakes_earlier_ingest():
+    lim, order = _limiter(), []
+    async def run(cls, hold=0.01):
+        async with lim.slot(cls):
+            order.append(cls)
+            await asyncio.sleep(hold)
+    async def main():
+        first = asyncio.create_task(run("ingest", 0.05))
+        await asyncio.sleep(0.01)
+        queued = [asyncio.create_task(run("ingest")), asyncio.create_task(run("ingest"))]
+        await asyncio.sleep(0)
+        queued.append(asyncio.create_task(run("search")))
+        await asyncio.gather(first, *queued)
+    asyncio.run(main())
+    assert order == ["ingest", "search", "ingest", "ingest"]
+    assert lim.stats()["ingest"]["active"] == lim.stats()["ingest"]["queued"] == 0
+
+def test_full_queue_is_refused_and_cancelled_waiters_leave_it():
+    lim = _limiter(queue=1)
+    async def main():
+        await lim.acquire("search")
+        waiter = asyncio.create_task(lim.acquire("search"))
+        await asyncio.sleep(0)
+        with pytest.raises(admission.Overloaded) as e:
+            await lim.acquire("search")
+        assert e.value.retry_after >= 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert lim.queued["search"] == 0
+        lim.release("search")
+    asyncio.run(main())
+    assert lim.stats()["search"] == {"active": 0, "queued": 0, "rejected": 1, "concurrency": 1, "queue": 1}
+
+def test_overloaded_route_returns_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(admission, "limiter", admission.Limiter(1, {"search": {"priority": 0, "concurrency": 0, "queue": 0}}))
+    r = client.get("/search", params={"q": "x"})
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
@@ -0,0 +1,20 @@
+from collections import Counter
+from fastapi.testclient import TestClient
+from bench.fakes import Upstream, make_app
+from bench.loadtest import summarize
+
+def test_fake_llm_streams_and_injects_errors():
+    client = TestClient(make_app(Upstream(), Upstream(), tokens=3))
+    r = client.post("/v1/chat/completions", json={"messages": [], "stream": True})
+    lines = [l for l in r.text.splitlines() if l.startswith("data:")]
+    assert len(lines) == 4 and lines[-1] == "data: [DONE]"
+
+    failing = TestClient(make_app(Upstream(error_rate=1.0), Upstream(), tokens=3))
+    assert failing.post("/v1/chat/completions", json={"messages": []}).status_code == 500
+    assert failing.get("/stats").json()["llm"] == {"calls": 1, "errors": 1}
+
+def test_summarize_counts_errors_and_percentiles():
+    s = summarize([0.01] * 98 + [0.5, 1.0], Counter({200: 99, 500: 1, "ReadTimeout": 1}), 2.0)
+    assert s["requests"] == 101 and s["ok"] == 99 and s["errors"] == 2
+    assert s["latency_ms"]["p50"] == 10.0 and s["latency_ms"]["max"] == 1000.0
+    assert s["rps"] == 50.5
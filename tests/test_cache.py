@@ -0,0 +1,36 @@
+from app.services.cache import LRUCache
+from app.services import cache
+
+def test_lru_eviction_and_counters():
+    c = LRUCache(2)
+    c.set("a", 1); c.set("b", 2)
+    assert c.get("a") == 1
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert c.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+def test_ttl_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    c = LRUCache(10, ttl=5)
+    c.set("q", [0.1])
+    now[0] += 4
+    assert c.get("q") == [0.1]
+    now[0] += 2
+    assert c.get("q") is None
+    assert c.evictions == 1
+
+def test_semantic_cache_threshold_and_context_match():
+    from app.services.answer_cache import SemanticCache
+    c = SemanticCache(maxsize=2, ttl=None, threshold=0.95)
+    c.set([1.0, 0.0], ["a", "b"], "reply")
+    assert c.get([1.0, 0.01], ["b", "a"]) == "reply"
+    assert c.get([1.0, 1.0], ["a", "b"]) is None
+    assert c.get([1.0, 0.0], ["a"]) is None
+    c.set([0.0, 1.0], ["c"], "r2")
+    c.set([0.0, 1.0], ["d"], "r3")
+    assert c.get([1.0, 0.0], ["a", "b"]) is None
+    assert c.stats()["evictions"] == 1
+    c.clear()
+    assert c.get([0.0, 1.0], ["d"]) is None
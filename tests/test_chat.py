@@ -0,0 +1,57 @@
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import embeddings, vector_store
+from app.services.local_store import LocalStore
+
+client = TestClient(app)
+
+def _local_backend(monkeypatch, tmp_path, texts):
+    async def aembed_query(text):
+        return [1.0, float(len(text))]
+    store = LocalStore(str(tmp_path), dim=2)
+    store.upsert_many(texts, [[1.0, float(i)] for i in range(len(texts))])
+    monkeypatch.setattr(embeddings, "aembed_query", aembed_query)
+    monkeypatch.setattr(vector_store, "_store", store)
+    return store
+
+def _events(raw):
+    out = []
+    for block in raw.strip().split("\n\n"):
+        lines = dict(l.split(": ", 1) for l in block.split("\n"))
+        out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+def test_chat_stream_sends_context_then_tokens(monkeypatch, tmp_path):
+    _local_backend(monkeypatch, tmp_path, ["Comet tracks runs.", "Weaviate stores vectors."])
+    r = client.post("/chat/stream", json={"message": "tracking?", "k": 2})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = _events(r.text)
+    assert [e for e, _ in events] == ["context", "token", "done"]
+    assert len(events[0][1]["context"]) == 2
+    assert events[2][1]["ttft"] is not None
+
+def test_chat_reuses_cached_answer_until_ingest(monkeypatch, tmp_path):
+    from app.services import answer_cache, friendli_client
+    _local_backend(monkeypatch, tmp_path, ["Comet tracks runs."])
+    async def generate(messages, deadline=None):
+        return "Comet does."
+    monkeypatch.setattr(friendli_client, "generate", generate)
+    answer_cache.invalidate()
+    first = client.post("/chat", json={"message": "tracking?", "k": 1}).json()
+    second = client.post("/chat", json={"message": "tracking?", "k": 1}).json()
+    assert first["cached"] is False and second["cached"] is True
+    assert second["reply"] == first["reply"]
+    answer_cache.invalidate()
+    assert client.post("/chat", json={"message": "tracking?", "k": 1}).json()["cached"] is False
+
+def test_placeholder_replies_are_not_cached(monkeypatch, tmp_path):
+    from app.services import answer_cache, friendli_client
+    _local_backend(monkeypatch, tmp_path, ["Comet tracks runs."])
+    monkeypatch.setattr(friendli_client, "API_URL", None)
+    answer_cache.invalidate()
+    for _ in range(2):
+        assert client.post("/chat", json={"message": "tracking?", "k": 1}).json()["cached"] is False
+        done = _events(client.post("/chat/stream", json={"message": "tracking?", "k": 1}).text)[-1]
+        assert done[0] == "done" and done[1]["cached"] is False
@@ -0,0 +1,48 @@
+import re
+from app.services import chunking
+
+class _WordTokenizer:
+    def __call__(self, text, **kw):
+        return {"offset_mapping": [m.span() for m in re.finditer(r"\S+", text)]}
+
+class _PieceTokenizer:
+    # Word pieces of up to 3 characters, like a subword vocabulary splitting long words.
+    def __call__(self, text, **kw):
+        return {"offset_mapping": [(s, min(s + 3, m.end())) for m in re.finditer(r"\S+", text)
+                                   for s in range(m.start(), m.end(), 3)]}
+
+TEXT = " ".join(f"word{n}" for n in range(50))
+LONG = " ".join("x" * (n % 9) + f"w{n}" for n in range(300))
+
+def test_windows_are_bounded_and_overlap():
+    spans = chunking.chunk_spans(TEXT, max_tokens=8, overlap=2, tokenizer=_WordTokenizer())
+    words = [TEXT[s:e].split() for s, e in spans]
+    assert all(len(w) <= 8 for w in words)
+    assert all(a[-2:] == b[:2] for a, b in zip(words, words[1:]))
+    assert words[0][0] == "word0" and words[-1][-1] == "word49"
+
+def test_streaming_matches_one_shot():
+    one_shot = chunking.chunk_spans(TEXT, max_tokens=8, overlap=2, tokenizer=_WordTokenizer())
+    c = chunking.Chunker(8, 2, _WordTokenizer(), buffer_chars=40)
+    chunks = []
+    for i in range(0, len(TEXT), 7):
+        chunks += c.feed(TEXT[i:i + 7])
+    chunks += c.finish()
+    assert [(s, e) for s, e, _ in chunks] == one_shot
+    assert all(TEXT[s:e] == t for s, e, t in chunks)
+
+def _streamed(text, part, buffer_chars):
+    c = chunking.Chunker(12, 4, _PieceTokenizer(), buffer_chars=buffer_chars)
+    chunks = []
+    for i in range(0, len(text), part):
+        chunks += c.feed(text[i:i + part])
+    return [(s, e) for s, e, _ in chunks + c.finish()]
+
+def test_subword_spans_do_not_depend_on_part_size():
+    one_shot = chunking.chunk_spans(LONG, max_tokens=12, overlap=4, tokenizer=_PieceTokenizer())
+    assert _streamed(LONG, 7, 60) == _streamed(LONG, 131, 200) == one_shot
+    assert all(s == 0 or LONG[s - 1] == " " for s, _ in one_shot)
+
+def test_short_doc_keeps_plain_id():
+    [(cid, text, meta)] = chunking.doc_chunks("hello world", tokenizer=_WordTokenizer())
+    assert cid == chunking.doc_id("hello world") and meta["end"] == len(text)
@@ -0,0 +1,30 @@
+from app.services import comet_tracker
+
+class _Recorder:
+    def __init__(self):
+        self.params, self.metrics = [], []
+    def log_parameters(self, p): self.params.append(p)
+    def log_metrics(self, m, step=None): self.metrics.append(m)
+    def log_asset(self, path): pass
+
+def test_aggregate():
+    agg = comet_tracker.aggregate([float(v) for v in range(1, 101)])
+    assert agg["count"] == 100 and agg["sum"] == 5050.0
+    assert agg["min"] == 1.0 and agg["max"] == 100.0
+    assert agg["p50"] == 51.0 and agg["p99"] == 99.0
+
+def test_flush_aggregates_and_logs_params_once(monkeypatch):
+    rec = _Recorder()
+    monkeypatch.setattr(comet_tracker, "_exp", rec)
+    monkeypatch.setattr(comet_tracker, "start", lambda: None)
+    monkeypatch.setattr(comet_tracker, "_params", {})
+    for v in (0.1, 0.3, 0.2):
+        comet_tracker.log_parameters({"embed_model": "m"})
+        comet_tracker.log_metric("ingest_seconds", v)
+    comet_tracker.flush()
+    comet_tracker.log_parameters({"embed_model": "m"})
+    comet_tracker.flush()
+    assert rec.params == [{"embed_model": "m"}]
+    assert len(rec.metrics) == 1
+    assert rec.metrics[0]["ingest_seconds_count"] == 3
+    assert rec.metrics[0]["ingest_seconds_max"] == 0.3
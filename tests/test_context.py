@@ -0,0 +1,34 @@
+from app.services import context, metrics
+
+def _hit(text, vec, score=0.0):
+    return {"id": text, "text": text, "score": score, "vector": vec}
+
+def test_mmr_drops_near_duplicates_and_prefers_diversity():
+    hits = [_hit("a", [1.0, 0.0, 0.0]), _hit("a'", [0.999, 0.01, 0.0]), _hit("b", [0.7, 0.7, 0.0]), _hit("c", [0.6, 0.0, 0.8])]
+    picked = [h["id"] for h in context.mmr([1.0, 0.0, 0.1], hits, k=3, lam=0.5)]
+    assert picked[0] == "a"
+    assert "a'" not in picked
+    assert sorted(picked[1:]) == ["b", "c"]
+
+def test_dropped_hits_are_counted_by_reason(monkeypatch):
+    dropped = metrics.Counter("test_context_dropped_total", "", ("reason",))
+    monkeypatch.setattr(context, "DROPPED", dropped)
+    hits = [_hit("a", [1.0, 0.0, 0.0]), _hit("a'", [0.999, 0.01, 0.0]), _hit("b", [0.7, 0.7, 0.0]),
+            _hit("c", [0.6, 0.0, 0.8]), _hit("d", [0.0, 1.0, 0.0]), _hit("e", [0.0, 0.0, 1.0])]
+    assert len(context.assemble([1.0, 0.0, 0.1], "q", hits, k=2)) == 2
+    assert {k[0]: v for k, v in dropped._values.items()} == {"duplicate": 1.0, "overfetch": 3.0, "budget": 0.0}
+
+def test_assemble_fits_budget_and_excerpts_best_span():
+    filler = "Nothing relevant is said in this sentence at all. " * 20
+    long = filler + "Comet tracks every training run for us. " + filler
+    hits = [_hit("short doc about comet.", [1.0, 0.0]), _hit(long, [0.0, 1.0])]
+    ctx = context.assemble([1.0, 1.0], "how does comet track training?", hits, k=2, budget=40)
+    assert [c.get("excerpt", False) for c in ctx] == [False, True]
+    assert "Comet tracks every training run" in ctx[1]["text"]
+    assert sum(context.tokens(c["text"]) for c in ctx) <= 40
+    assert all("vector" not in c for c in ctx)
+
+def test_assemble_stops_when_budget_is_spent():
+    hits = [_hit("x" * 400, [1.0, 0.0]), _hit("y" * 400, [0.0, 1.0])]
+    ctx = context.assemble([1.0, 0.5], "q", hits, k=2, budget=110)
+    assert [c["id"] for c in ctx] == ["x" * 400]
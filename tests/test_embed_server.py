@@ -0,0 +1,51 @@
+import asyncio, threading
+import numpy as np
+from app.services import embed_server
+
+class _Model:
+    def __init__(self):
+        self.calls = []
+    def encode(self, texts, batch_size=32, **kw):
+        self.calls.append(len(texts))
+        return np.array([[len(t), 1.0, 0.5] for t in texts], dtype=np.float32)
+
+def _start(tmp_path, window_ms=20):
+    model, ready = _Model(), threading.Event()
+    server = embed_server.Server(model, "fake@test", window_ms=window_ms, max_batch=64)
+    path = str(tmp_path / "embed.sock")
+    threading.Thread(target=lambda: asyncio.run(server.serve(path, ready)), daemon=True).start()
+    assert ready.wait(5)
+    return model, path
+
+def test_remote_encoder_round_trip_through_shared_memory(tmp_path):
+    _, path = _start(tmp_path)
+    enc = embed_server.RemoteEncoder(path, "unused", "fake@test", connections=2)
+    texts = [f"text {'x' * n}" for n in range(300)]   # more rows than the initial buffer
+    out = enc.encode(texts)
+    assert out.dtype == np.float32 and out.shape == (300, 3)
+    assert out[:, 0].tolist() == [float(len(t)) for t in texts]
+    assert enc.encode([]).shape == (0, 3)
+    enc.close()
+
+def test_requests_from_separate_clients_share_encode_calls(tmp_path):
+    model, path = _start(tmp_path, window_ms=50)
+    clients = [embed_server.RemoteEncoder(path, "unused", "fake@test") for _ in range(4)]
+    threads = [threading.Thread(target=c.encode, args=([f"q{i}"],)) for i, c in enumerate(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(model.calls[1:]) == 4 and len(model.calls) - 1 < 4   # calls[0] is the dim probe
+    assert clients[0].stats()["items"] == 4
+    for c in clients:
+        c.close()
+
+def test_model_mismatch_is_refused(tmp_path):
+    _, path = _start(tmp_path)
+    enc = embed_server.RemoteEncoder(path, "unused", "other@torch")
+    try:
+        enc.encode(["x"])
+    except RuntimeError as e:
+        assert "fake@test" in str(e)
+    else:
+        raise AssertionError("expected a model mismatch")
@@ -0,0 +1,67 @@
+import asyncio
+import numpy as np, pytest
+from app.services import embed_backends
+from app.services.embeddings import Batcher
+
+def test_batcher_groups_concurrent_requests():
+    calls = []
+    def encode(texts):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+    b = Batcher(encode, window_ms=20, max_batch=8)
+
+    async def run():
+        return await asyncio.gather(*(b.submit("x" * i) for i in range(1, 11)))
+
+    out = asyncio.run(run())
+    assert out == [[float(i)] for i in range(1, 11)]
+    assert [len(c) for c in calls] == [8, 2]
+    assert b.batches == 2 and b.items == 10
+
+def test_batcher_propagates_encode_errors():
+    def encode(texts):
+        raise ValueError("boom")
+    b = Batcher(encode, window_ms=1, max_batch=4)
+
+    async def run():
+        return await asyncio.gather(b.submit("a"), b.submit("b"), return_exceptions=True)
+
+    out = asyncio.run(run())
+    assert all(isinstance(e, ValueError) for e in out)
+
+def test_bulk_encode_runs_on_the_batcher_thread():
+    import threading
+    threads = []
+    def encode(texts):
+        threads.append(threading.current_thread().name)
+        return [[float(len(t))] for t in texts]
+    b = Batcher(encode, window_ms=1, max_batch=4)
+
+    async def run():
+        return await asyncio.gather(b.encode_now(["a", "bb"]), b.submit("ccc"))
+
+    assert asyncio.run(run()) == [[[1.0], [2.0]], [3.0]]
+    assert len(set(threads)) == 1 and threads[0].startswith("embed")
+
+def test_mean_pool_ignores_padding_and_normalizes():
+    hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]])
+    mask = np.array([[1, 1, 0]])
+    assert embed_backends.mean_pool(hidden, mask).tolist() == [[1.0, 0.0]]
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(RuntimeError, match="EMBED_BACKEND"):
+        embed_backends.load("fp8", "any-model")
+
+def test_query_vectors_stay_float32_arrays(monkeypatch):
+    from app.services import embeddings
+    class Model:
+        def encode(self, texts, batch_size=32, **kw):
+            return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float64)
+    monkeypatch.setattr(embeddings, "_model", Model())
+    monkeypatch.setattr(embeddings, "_batcher", None)
+    embeddings.query_cache.clear()
+    vec = asyncio.run(embeddings.aembed_query("numpy please"))
+    batch = asyncio.run(embeddings.aembed_queries(["numpy please", "fresh one"]))
+    assert isinstance(vec, np.ndarray) and vec.dtype == np.float32 and not vec.flags.writeable
+    assert batch[0] is vec and batch[1].tolist() == [9.0, 1.0]
+    assert embeddings.embed_many(["ab", "c"]).shape == (2, 2)
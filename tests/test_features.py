@@ -0,0 +1,31 @@
+import numpy as np
+from app.services.features import FeatureCache
+
+def _encoder(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+    return encode
+
+def test_only_new_texts_are_encoded(tmp_path):
+    calls = []
+    cache = FeatureCache(str(tmp_path))
+    X = cache.extract(["a", "bb", "a"], encode=_encoder(calls), chunk=1)
+    assert calls == [["a"], ["bb"]]
+    assert X.dtype == np.float32 and X[:, 0].tolist() == [1, 2, 1]
+
+    calls.clear()
+    reopened = FeatureCache(str(tmp_path))
+    X = reopened.extract(["bb", "ccc", "a"], encode=_encoder(calls))
+    assert calls == [["ccc"]]
+    assert X[:, 0].tolist() == [2, 3, 1]
+    assert reopened.stats()["hits"] == 2
+
+def test_shards_are_compacted(tmp_path):
+    cache = FeatureCache(str(tmp_path), max_shards=2)
+    for t in ["a", "bb", "ccc"]:
+        cache.extract([t], encode=_encoder([]))
+    assert cache.stats()["shards"] == 1
+    calls = []
+    X = FeatureCache(str(tmp_path)).extract(["ccc", "a", "bb"], encode=_encoder(calls))
+    assert calls == [] and X[:, 0].tolist() == [3, 1, 2]
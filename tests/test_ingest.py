@@ -0,0 +1,92 @@
+import json, re
+from fastapi.testclient import TestClient
+from app.main import app
+from app.routes import ingest
+from app.services import embeddings, vector_store, chunking
+from app.services.local_store import LocalStore
+
+client = TestClient(app)
+
+class _WordTokenizer:
+    def __call__(self, text, **kw):
+        return {"offset_mapping": [m.span() for m in re.finditer(r"\S+", text)]}
+
+class _RecordingStore(LocalStore):
+    def __init__(self, path):
+        super().__init__(str(path), dim=1)
+        self.writes = []
+    def upsert_many(self, texts, vectors, ids=None, metas=None):
+        self.writes.append(list(texts))
+        ids = ids or [vector_store.doc_id(t) for t in texts]
+        ok = [n for n, t in enumerate(texts) if t != "bad"]
+        super().upsert_many([texts[n] for n in ok], [vectors[n] for n in ok], [ids[n] for n in ok], metas and [metas[n] for n in ok])
+        return ids, {n: "rejected" for n, t in enumerate(texts) if t == "bad"}
+
+def _fake_backend(monkeypatch, tmp_path, stored=()):
+    async def aembed_many(texts):
+        return [[float(len(t))] for t in texts]
+    async def aembed(text):
+        return [float(len(text))]
+    store = _RecordingStore(tmp_path)
+    if stored:
+        LocalStore.upsert_many(store, list(stored), [[1.0]] * len(stored))
+    monkeypatch.setattr(embeddings, "aembed_many", aembed_many)
+    monkeypatch.setattr(embeddings, "aembed", aembed)
+    monkeypatch.setattr(vector_store, "_store", store)
+    monkeypatch.setattr(ingest, "BATCH_SIZE", 2)
+    return store
+
+def test_ingest_batch_reports_per_item_results(monkeypatch, tmp_path):
+    store = _fake_backend(monkeypatch, tmp_path)
+    r = client.post("/ingest/batch", json=[{"text": t} for t in ["a", "b", "bad", "c", "d"]])
+    assert r.status_code == 200
+    data = r.json()
+    assert sorted(len(w) for w in store.writes) == [1, 2, 2]
+    assert data["ingested"] == 4 and data["failed"] == 1
+    assert [it["index"] for it in data["items"]] == [0, 1, 2, 3, 4]
+    assert data["items"][2]["error"] == "rejected"
+    assert data["items"][0]["id"] == vector_store.doc_id("a")
+
+def test_ingest_stream_ndjson(monkeypatch, tmp_path):
+    _fake_backend(monkeypatch, tmp_path)
+    lines = [json.dumps({"text": "a"}), "not json", json.dumps("b"), ""]
+    r = client.post("/ingest/stream", content="\n".join(lines).encode())
+    assert r.status_code == 200
+    data = r.json()
+    assert data["ingested"] == 2 and data["failed"] == 1
+    assert data["items"][1]["error"].startswith("Invalid line")
+
+def test_ingest_batch_skips_stored_and_repeated_docs(monkeypatch, tmp_path):
+    store = _fake_backend(monkeypatch, tmp_path, stored=["a"])
+    r = client.post("/ingest/batch", json=[{"text": t} for t in ["a", "b", "b", "c"]])
+    data = r.json()
+    assert store.writes == [["b"], ["c"]]
+    assert data["skipped"] == 2 and data["ingested"] == 2
+    assert [it["skipped"] for it in data["items"]] == [True, False, True, False]
+    assert data["items"][0]["id"] == vector_store.doc_id("a")
+
+    store.writes.clear()
+    r = client.post("/ingest/batch", params={"force": True}, json=[{"text": "a"}])
+    assert store.writes == [["a"]] and r.json()["skipped"] == 0
+
+def test_repeats_of_a_failed_doc_report_its_error(monkeypatch, tmp_path):
+    store = _fake_backend(monkeypatch, tmp_path)
+    # Batches of two: a repeat in the same batch, and one in a later batch.
+    data = client.post("/ingest/batch", json=[{"text": t} for t in ["bad", "bad", "a", "bad"]]).json()
+    assert sorted(store.writes) == [["a"], ["bad"]]
+    assert [it["error"] for it in data["items"]] == ["rejected", "rejected", None, "rejected"]
+    assert data["failed"] == 3 and data["skipped"] == 0 and data["ingested"] == 1
+
+def test_ingest_document_streams_chunks(monkeypatch, tmp_path):
+    store = _fake_backend(monkeypatch, tmp_path)
+    Chunker = chunking.Chunker
+    monkeypatch.setattr(chunking, "Chunker", lambda: Chunker(4, 1, _WordTokenizer(), buffer_chars=32))
+    text = " ".join(f"w{n}" for n in range(40))
+    parts = [text.encode()[i:i + 10] for i in range(0, len(text), 10)]
+    r = client.post("/ingest/document", params={"name": "doc"}, content=iter(parts))
+    data = r.json()
+    assert data["ok"] and data["items"][0]["id"] == vector_store.doc_id("doc")
+    assert data["chunks"] == 13
+    hits = store.search([1.0], k=100)
+    assert {h["parent_id"] for h in hits} == {vector_store.doc_id("doc")}
+    assert all(text[h["start"]:h["end"]] == h["text"] for h in hits)
@@ -0,0 +1,58 @@
+import numpy as np
+from app.services.local_store import LocalStore
+
+def _corpus(n, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(16, dim))
+    X = centers[rng.integers(0, 16, n)] + 0.1 * rng.normal(size=(n, dim))
+    return [f"doc {i}" for i in range(n)], X.astype(np.float32)
+
+def test_exact_search_matches_brute_force(tmp_path):
+    texts, X = _corpus(500, 8)
+    s = LocalStore(str(tmp_path), dim=8)
+    s.upsert_many(texts, X)
+    q = X[42]
+    Xn = X / np.linalg.norm(X, axis=1, keepdims=True)
+    expected = np.argsort(-(Xn @ (q / np.linalg.norm(q))))[:5]
+    hits = s.search(q, k=5)
+    assert [h["text"] for h in hits] == [texts[i] for i in expected]
+    assert hits[0]["text"] == "doc 42" and abs(hits[0]["score"] - 1.0) < 1e-5
+
+def test_persistence_and_upsert_in_place(tmp_path):
+    texts, X = _corpus(50, 4)
+    s = LocalStore(str(tmp_path), dim=4, dtype="float16")
+    ids, _ = s.upsert_many(texts, X)
+    s.upsert_many(texts[:5], X[:5])
+    s.close()
+    s2 = LocalStore(str(tmp_path), dim=4, dtype="float32")
+    s2.open()
+    assert s2.n == 50 and s2.dtype == np.float16
+    assert s2.existing_ids(ids[:3] + ["missing"]) == set(ids[:3])
+    assert s2.search(X[7], k=1)[0]["text"] == "doc 7"
+
+def test_ivf_recall(tmp_path):
+    texts, X = _corpus(4000, 16)
+    s = LocalStore(str(tmp_path), dim=16, index="ivf", nlist=16, nprobe=4)
+    s.upsert_many(texts, X)
+    s.build_index()
+    more_texts, more = _corpus(100, 16, seed=1)
+    s.upsert_many([t + "b" for t in more_texts], more)
+    exact = LocalStore(str(tmp_path / "exact"), dim=16)
+    exact.upsert_many(texts + [t + "b" for t in more_texts], np.vstack([X, more]))
+    recall = []
+    for i in range(0, 4100, 97):
+        q = np.vstack([X, more])[i]
+        a = {h["id"] for h in s.search(q, k=10)}
+        b = {h["id"] for h in exact.search(q, k=10)}
+        recall.append(len(a & b) / 10)
+    assert np.mean(recall) > 0.9
+
+def test_search_many_matches_single_queries(tmp_path):
+    texts, X = _corpus(300, 8)
+    s = LocalStore(str(tmp_path), dim=8)
+    s.upsert_many(texts, X)
+    ks = [1, 5, 0, 3]
+    batched = s.search_many(X[[3, 40, 41, 250]], ks)
+    assert [len(h) for h in batched] == ks
+    for hits, q, k in zip(batched, X[[3, 40, 41, 250]], ks):
+        assert [h["id"] for h in hits] == [h["id"] for h in s.search(q, k)]
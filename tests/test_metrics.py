@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import metrics
+
+client = TestClient(app)
+
+def test_histogram_renders_cumulative_buckets():
+    h = metrics.Histogram("test_seconds", "test", ("op",), buckets=(0.1, 1))
+    for v in (0.05, 0.5, 5):
+        h.observe(v, op="a")
+    lines = h.render()
+    assert 'test_seconds_bucket{op="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{op="a",le="1"} 2' in lines
+    assert 'test_seconds_bucket{op="a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{op="a"} 3' in lines
+
+def test_metrics_endpoint_reports_routes_and_stats():
+    client.get("/health")
+    client.get("/train/abc")
+    text = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in text
+    assert 'route="/train/{job_id}",status="404"' in text
+    assert 'http_requests_in_flight 1.0' in text
+    assert 'cache_hits_total{cache="query"}' in text
@@ -0,0 +1,76 @@
+import pickle
+import numpy as np
+from fastapi.testclient import TestClient
+from sklearn.linear_model import LogisticRegression
+from app.main import app
+from app.services import embeddings, model_registry
+
+client = TestClient(app)
+
+def _model(flip=False):
+    X = np.array([[1.0, 0.0], [0.0, 1.0]] * 4)
+    y = np.array([1, 0] * 4)
+    return pickle.dumps(LogisticRegression().fit(X, 1 - y if flip else y))
+
+def test_predict_serves_promoted_version(monkeypatch, tmp_path):
+    async def aembed(text):
+        return [1.0, 0.0] if text.startswith("good") else [0.0, 1.0]
+    monkeypatch.setattr(embeddings, "aembed", aembed)
+    monkeypatch.setattr(model_registry, "REGISTRY_PATH", str(tmp_path))
+    monkeypatch.setattr(model_registry, "_current", None)
+    monkeypatch.setattr(model_registry, "_loaded", False)
+
+    assert client.post("/predict", json={"texts": ["good"]}).status_code == 503
+    v1 = model_registry.register(_model(), {"accuracy": 1.0})
+    v2 = model_registry.register(_model(flip=True), {"accuracy": 0.0})
+    model_registry.promote(v1)
+
+    r = client.post("/predict", json={"texts": ["good day", "bad day"]})
+    data = r.json()
+    assert data["version"] == v1
+    assert [p["label"] for p in data["predictions"]] == [1, 0]
+    assert data["predictions"][0]["proba"]["1"] > 0.5
+
+    assert client.post(f"/models/{v2}/promote").json()["current"] == v2
+    assert [p["label"] for p in client.post("/predict", json={"texts": ["good day"]}).json()["predictions"]] == [0]
+    models = client.get("/models").json()
+    assert models["current"] == v2 and [v["version"] for v in models["versions"]] == [v1, v2]
+
+    monkeypatch.setattr(model_registry, "_loaded", False)
+    assert model_registry.current()[0] == v2
+
+def test_promote_by_another_worker_is_picked_up(monkeypatch, tmp_path):
+    monkeypatch.setattr(model_registry, "REGISTRY_PATH", str(tmp_path))
+    monkeypatch.setattr(model_registry, "_current", None)
+    monkeypatch.setattr(model_registry, "_loaded", False)
+    v1 = model_registry.register(_model(), {})
+    v2 = model_registry.register(_model(flip=True), {})
+    model_registry.promote(v1)
+    assert model_registry.current()[0] == v1
+    # What promote() in another process leaves behind: only the CURRENT file changes.
+    (tmp_path / "CURRENT.other").write_text(v2)
+    (tmp_path / "CURRENT.other").replace(tmp_path / "CURRENT")
+    version, model = model_registry.current()
+    assert version == v2 and model.predict(np.array([[1.0, 0.0]])).tolist() == [0]
+
+def test_predict_loads_the_model_off_the_event_loop(monkeypatch, tmp_path):
+    import asyncio
+    async def aembed(text):
+        return [1.0, 0.0]
+    monkeypatch.setattr(embeddings, "aembed", aembed)
+    monkeypatch.setattr(model_registry, "REGISTRY_PATH", str(tmp_path))
+    model_registry.promote(model_registry.register(_model(), {}))
+    monkeypatch.setattr(model_registry, "_current", None)
+    monkeypatch.setattr(model_registry, "_loaded", False)
+    on_loop, load = [], model_registry.load
+    def recording_load():
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return load()
+    monkeypatch.setattr(model_registry, "load", recording_load)
+    for _ in range(2):
+        assert client.post("/predict", json={"texts": ["good"]}).status_code == 200
+    assert on_loop == [False]
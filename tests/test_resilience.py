@@ -0,0 +1,98 @@
+import asyncio, time
+import httpx, pytest
+from app.services import friendli_client, http_pool, resilience
+
+def test_breaker_opens_then_probes_once():
+    changes = []
+    b = resilience.Breaker(failures=2, reset_after=0.05, on_change=changes.append)
+    b.record(False)
+    assert b.allow()
+    b.record(False)
+    assert not b.allow() and b.rejected == 1
+    time.sleep(0.06)
+    assert b.allow() and not b.allow()
+    b.record(False)
+    assert b.state == "open"
+    time.sleep(0.06)
+    assert b.allow()
+    b.record(True)
+    assert b.allow() and changes == ["open", "half_open", "open", "half_open", "closed"]
+
+def test_cancelled_probe_frees_the_half_open_slot(monkeypatch):
+    b = resilience.Breaker(failures=1, reset_after=0.0)
+    b.record(False)
+    async def hang(payload, deadline):
+        await asyncio.sleep(10)
+    monkeypatch.setattr(friendli_client, "breaker", b)
+    monkeypatch.setattr(friendli_client, "API_URL", "http://friendli.invalid")
+    monkeypatch.setattr(friendli_client, "API_KEY", "key")
+    monkeypatch.setattr(friendli_client, "_post", hang)
+    async def probe_then_cancel():
+        task = asyncio.create_task(friendli_client.generate([]))
+        await asyncio.sleep(0.01)
+        assert b.state == "half_open" and not b.allow()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(probe_then_cancel())
+    assert b.state == "half_open" and b.allow()
+
+def _hanging_upstream(monkeypatch, breaker):
+    async def hang(request):
+        await asyncio.sleep(10)
+    monkeypatch.setattr(friendli_client, "breaker", breaker)
+    monkeypatch.setattr(friendli_client, "API_URL", "http://friendli.invalid")
+    monkeypatch.setattr(friendli_client, "API_KEY", "key")
+    monkeypatch.setattr(http_pool, "client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(hang)))
+
+def test_cancelled_stream_is_not_an_upstream_failure(monkeypatch):
+    b = resilience.Breaker(failures=2, reset_after=30)
+    _hanging_upstream(monkeypatch, b)
+    async def consume():
+        async for _ in friendli_client.stream([]):
+            pass
+    async def cancel_twice():
+        for _ in range(2):
+            task = asyncio.create_task(consume())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+    asyncio.run(cancel_twice())
+    assert b.state == "closed" and b.consecutive == 0 and b.allow()
+
+def test_stream_with_spent_deadline_leaves_breaker_alone(monkeypatch):
+    b = resilience.Breaker(failures=1, reset_after=0.0)
+    b.record(False)
+    _hanging_upstream(monkeypatch, b)
+    async def consume():
+        async for _ in friendli_client.stream([], deadline=time.monotonic() - 1):
+            pass
+    for _ in range(2):
+        with pytest.raises(resilience.DeadlineExceeded):
+            asyncio.run(consume())
+    assert b.consecutive == 1 and b.allow() and b.state == "half_open"
+
+def test_hedge_wins_over_slow_attempt():
+    delays, events = [1.0, 0.01], []
+    async def attempt():
+        d = delays.pop(0)
+        await asyncio.sleep(d)
+        return d
+    t0 = time.monotonic()
+    assert asyncio.run(resilience.hedged(attempt, delay=0.02, on_hedge=events.append)) == 0.01
+    assert time.monotonic() - t0 < 0.5
+    assert events == ["sent", "won"]
+
+def test_hedged_respects_deadline():
+    async def attempt():
+        await asyncio.sleep(1)
+    with pytest.raises(resilience.DeadlineExceeded):
+        asyncio.run(resilience.hedged(attempt, deadline=time.monotonic() + 0.05))
+
+def test_latency_window_needs_samples():
+    w = resilience.LatencyWindow(size=10, min_samples=3)
+    w.add(1.0); w.add(2.0)
+    assert w.quantile(0.95) is None
+    w.add(3.0)
+    assert w.quantile(0.95) == 3.0 and w.quantile(0.0) == 1.0
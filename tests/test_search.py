@@ -0,0 +1,29 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import embeddings, vector_store
+from app.services.local_store import LocalStore
+
+client = TestClient(app)
+
+def test_search_batch_embeds_misses_once_and_keeps_order(monkeypatch, tmp_path):
+    calls = []
+    async def aembed_many(texts):
+        calls.append(list(texts))
+        return [[1.0, float(len(t))] for t in texts]
+    texts = ["a", "bbb", "cccccc"]
+    store = LocalStore(str(tmp_path), dim=2)
+    store.upsert_many(texts, [[1.0, float(len(t))] for t in texts])
+    monkeypatch.setattr(embeddings, "aembed_many", aembed_many)
+    monkeypatch.setattr(vector_store, "_store", store)
+    embeddings.query_cache.clear()
+
+    queries = [{"q": "cccccc", "k": 1}, {"q": "a", "k": 2}, {"q": "cccccc", "k": 1}]
+    r = client.post("/search/batch", json={"queries": queries})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [res["q"] for res in results] == ["cccccc", "a", "cccccc"]
+    assert [[h["text"] for h in res["hits"]] for res in results] == [["cccccc"], ["a", "bbb"], ["cccccc"]]
+    assert calls == [["cccccc", "a"]]
+
+    client.post("/search/batch", json={"queries": [{"q": "a", "k": 1}]})
+    assert len(calls) == 1
@@ -0,0 +1,35 @@
+import asyncio, subprocess, sys
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import embeddings, model_registry, vector_store, warmup
+from app.services.local_store import LocalStore
+
+client = TestClient(app)
+
+def test_import_defers_heavy_modules():
+    code = ("import sys, app.main; "
+            "print(sorted(m for m in ('torch', 'sklearn', 'comet_ml', 'weaviate', 'sentence_transformers') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+def test_ready_after_warmup_retries(monkeypatch, tmp_path):
+    calls = []
+    async def aembed(text):
+        calls.append(text)
+        if len(calls) == 1:
+            raise RuntimeError("model still downloading")
+        return [1.0, 0.0]
+    monkeypatch.setattr(embeddings, "aembed", aembed)
+    monkeypatch.setattr(vector_store, "_store", LocalStore(str(tmp_path / "vectors"), dim=2))
+    monkeypatch.setattr(model_registry, "REGISTRY_PATH", str(tmp_path / "models"))
+    monkeypatch.setattr(model_registry, "_current", None)
+    monkeypatch.setattr(model_registry, "_loaded", False)
+    monkeypatch.setattr(warmup, "ENABLED", True)
+    monkeypatch.setattr(warmup, "RETRY_INTERVAL", 0)
+    monkeypatch.setattr(warmup, "state", {"ready": False, "steps": {}, "errors": {}})
+
+    assert client.get("/ready").status_code == 503
+    asyncio.run(warmup.run())
+    r = client.get("/ready")
+    assert r.status_code == 200
+    assert set(r.json()["steps"]) == {"embeddings", "vector_store", "model"} and r.json()["errors"] == {}
@@ -0,0 +1,96 @@
+import asyncio, threading
+import numpy as np
+from app.services import embeddings, features, model_registry, train_jobs
+
+TEXTS = ["good", "great", "fine", "nice", "bad", "awful", "poor", "sad"]
+LABELS = [1, 1, 1, 1, 0, 0, 0, 0]
+
+def _fake_embeddings(monkeypatch, tmp_path):
+    def encode(texts):
+        return np.array([[1.0, 0.0] if t in TEXTS[:4] else [0.0, 1.0] for t in texts], dtype=np.float32)
+    monkeypatch.setattr(embeddings, "encode", encode)
+    monkeypatch.setattr(features, "_cache", features.FeatureCache(str(tmp_path / "features")))
+    monkeypatch.setattr(train_jobs, "EMBED_CHUNK", 3)
+
+async def _wait(job):
+    while job["status"] in train_jobs.ACTIVE:
+        await asyncio.sleep(0.05)
+    return job
+
+def test_job_runs_in_worker_process(monkeypatch, tmp_path):
+    _fake_embeddings(monkeypatch, tmp_path)
+    monkeypatch.setattr(model_registry, "REGISTRY_PATH", str(tmp_path / "models"))
+    monkeypatch.setattr(model_registry, "_current", None)
+
+    async def run():
+        job = train_jobs.submit(TEXTS, LABELS)
+        assert train_jobs.get(job["id"]) is job and job["status"] == "queued"
+        await _wait(job)
+        await train_jobs.stop()
+        return job
+    job = asyncio.run(run())
+    assert job["status"] == "done", job["error"]
+    assert job["embedded"] == len(TEXTS) and job["result"]["accuracy"] == 1.0
+    version, model = model_registry.current()
+    assert version == job["result"]["version"] == "v000001"
+    assert model.predict(np.array([[1.0, 0.0]])).tolist() == [1]
+
+def test_queue_limit_and_cancel(monkeypatch, tmp_path):
+    _fake_embeddings(monkeypatch, tmp_path)
+    release = threading.Event()
+    def blocked(texts):
+        release.wait()
+        return np.zeros((len(texts), 2), dtype=np.float32)
+    monkeypatch.setattr(embeddings, "encode", blocked)
+    monkeypatch.setattr(train_jobs, "WORKERS", 1)
+    monkeypatch.setattr(train_jobs, "MAX_PENDING", 1)
+
+    async def run():
+        first = train_jobs.submit(TEXTS, LABELS)
+        second = train_jobs.submit(TEXTS, LABELS)
+        try:
+            train_jobs.submit(TEXTS, LABELS)
+            assert False, "expected QueueFull"
+        except train_jobs.QueueFull:
+            pass
+        await asyncio.sleep(0)
+        assert first["status"] == "embedding" and second["status"] == "queued"
+        train_jobs.cancel(second["id"])
+        train_jobs.cancel(first["id"])
+        await _wait(first); await _wait(second)
+        release.set()
+        return first, second
+    first, second = asyncio.run(run())
+    assert first["status"] == second["status"] == "cancelled"
+
+def test_cancel_stops_embedding_between_chunks(monkeypatch, tmp_path):
+    _fake_embeddings(monkeypatch, tmp_path)
+    started, release, calls = threading.Event(), threading.Event(), []
+    def blocked(texts):
+        calls.append(len(texts))
+        started.set()
+        release.wait()
+        return np.zeros((len(texts), 2), dtype=np.float32)
+    monkeypatch.setattr(embeddings, "encode", blocked)
+
+    async def run():
+        job = train_jobs.submit(TEXTS, LABELS)
+        await asyncio.to_thread(started.wait)
+        train_jobs.cancel(job["id"])
+        await _wait(job)
+        release.set()
+        await asyncio.sleep(0.2)
+        return job
+    job = asyncio.run(run())
+    assert job["status"] == "cancelled"
+    assert calls == [3] and features.cache().misses == len(TEXTS) and not features.cache().index
+
+def test_too_few_examples_is_a_client_error():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    client = TestClient(app)
+    pairs = [{"text": t, "label": l} for t, l in zip(TEXTS[:3], LABELS[:3])]
+    before = len(train_jobs.jobs)
+    for body in ({"labelled_pairs": []}, {"labelled_pairs": pairs}):
+        assert client.post("/train", json=body).status_code == 400
+    assert len(train_jobs.jobs) == before
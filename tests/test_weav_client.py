@@ -0,0 +1,47 @@
+from app.services import weav_client
+
+class _Collections:
+    def __init__(self):
+        self.listed = 0
+        self.created = []
+    def exists(self, name):
+        self.listed += 1
+        return name in self.created
+    def create(self, name, **kw):
+        self.created.append(name)
+        self.config = kw
+    def get(self, name):
+        return _Collection()
+
+class _Collection:
+    class config:
+        @staticmethod
+        def get():
+            return type("Config", (), {"properties": weav_client.PROPERTIES})()
+
+class _Client:
+    def __init__(self):
+        self.collections = _Collections()
+
+def test_schema_check_is_cached_until_invalidated(monkeypatch):
+    fake = _Client()
+    monkeypatch.setattr(weav_client, "client", lambda: fake)
+    weav_client.invalidate_schema()
+    weav_client.ensure_schema()
+    weav_client.ensure_schema()
+    assert fake.collections.listed == 1
+    weav_client.invalidate_schema()
+    weav_client.ensure_schema()
+    assert fake.collections.listed == 2
+    weav_client.invalidate_schema()
+
+def test_schema_is_created_with_a_config_the_client_accepts(monkeypatch):
+    from weaviate.collections.classes.config import _CollectionConfigCreate
+    fake = _Client()
+    monkeypatch.setattr(weav_client, "client", lambda: fake)
+    weav_client.invalidate_schema()
+    weav_client.ensure_schema()
+    assert fake.collections.created == [weav_client.WEAV_CLASS]
+    # The same validation the real client runs before sending the create request
+    _CollectionConfigCreate(name=weav_client.WEAV_CLASS, **fake.collections.config)
+    weav_client.invalidate_schema()